@@ -2,39 +2,46 @@
 Cloud Function 服务
 """
 
-# 使用工厂函数获取类，避免循环导入
-from .core import (
-    get_registry_class,
-    get_executor_class,
-    get_env_manager_class,
-    get_project_process_class,
-    get_project_manager_class,
-    get_api_server_class,
-    get_state_class,
-    get_master_class,
-    get_master
-)
-
-# 初始化类引用，确保向后兼容
-FunctionRegistry = get_registry_class()
-FunctionExecutor = get_executor_class()
-EnvManager = get_env_manager_class()
-ProjectProcess = get_project_process_class()
-ProjectManager = get_project_manager_class()
-APIServer = get_api_server_class()
-ServerState = get_state_class()
-Master = get_master_class()
-
-from .utils import (
-    get_logger,
-    setup_logging,
-    get_project_logger,
-    get_db_manager,
-    close_all_connections,
-    get_connection_status,
-    reset_connection_pool,
-    get_llm_client
-)
+import importlib
+import os
+
+# 延迟导入映射：名称 -> (模块, 属性)，首次访问时才导入，避免循环导入和启动开销
+_LAZY = {
+    # 核心组件
+    'FunctionRegistry': ('.core.registry', 'FunctionRegistry'),
+    'FunctionExecutor': ('.core.executor', 'FunctionExecutor'),
+    'EnvManager': ('.core.env', 'EnvManager'),
+    'ProjectProcess': ('.core.project', 'ProjectProcess'),
+    'ProjectManager': ('.core.project', 'ProjectManager'),
+    'APIServer': ('.core.server', 'APIServer'),
+    'ServerState': ('.core.state', 'ServerState'),
+    'Master': ('.core.master', 'Master'),
+    'get_master': ('.core', 'get_master'),
+
+    # 工具函数
+    'get_logger': ('.utils', 'get_logger'),
+    'setup_logging': ('.utils', 'setup_logging'),
+    'get_project_logger': ('.utils', 'get_project_logger'),
+    'get_db_manager': ('.utils', 'get_db_manager'),
+    'close_all_connections': ('.utils', 'close_all_connections'),
+    'get_connection_status': ('.utils', 'get_connection_status'),
+    'reset_connection_pool': ('.utils', 'reset_connection_pool'),
+    'get_llm_client': ('.utils', 'get_llm_client'),
+}
+
+def __getattr__(name):
+    """首次访问时导入并缓存到模块全局变量"""
+    spec = _LAZY.get(name)
+    if spec is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = spec
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    # 写入模块全局变量后，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
 
 __all__ = [
     # 核心组件
@@ -46,7 +53,7 @@ __all__ = [
     'APIServer',
     'ServerState',
     'Master',
-    
+
     # 工具函数
     'get_logger',
     'setup_logging',
@@ -56,4 +63,9 @@ __all__ = [
     'get_connection_status',
     'reset_connection_pool',
     'get_llm_client'
-] 
\ No newline at end of file
+]
+
+# CI 等场景可设置 CLOUDFUNCTION_EAGER_IMPORT=1，启动时即解析全部名称以尽早暴露导入错误
+if os.getenv("CLOUDFUNCTION_EAGER_IMPORT") == "1":
+    for _name in _LAZY:
+        __getattr__(_name)
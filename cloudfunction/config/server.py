@@ -1,35 +1,125 @@
 import os
-from typing import Optional
+from dataclasses import dataclass
+from functools import cache
+from typing import FrozenSet, Optional
+
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+def _env_set(name: str, default: str) -> FrozenSet[str]:
+    """逗号分隔的环境变量转为集合，去除空白和空项"""
+    return frozenset(item.strip() for item in os.getenv(name, default).split(",") if item.strip())
+
+
+@dataclass(frozen=True, slots=True)
+class ServerConfig:
+    """服务器配置（进程内只读）"""
+    # 服务器配置
+    host: str
+    port: int
+    server_url: str
+
+    # SSL配置
+    ssl_enabled: bool
+    ssl_keyfile: Optional[str]
+    ssl_certfile: Optional[str]
+    ssl_ca_certs: Optional[str]
+
+    # 代理配置
+    proxy_headers: bool
+    trusted_hosts: FrozenSet[str]
+    forwarded_allow_ips: FrozenSet[str]
+
+    # 并发配置
+    max_concurrent: int
+    max_inflight: int
+    workers: int
+    backlog: int
+
+    # 超时配置
+    timeout_keep_alive: int
+    timeout_graceful_shutdown: int
+    timeout_notify: int
+
+    # 清理配置
+    cleanup_interval: int
+
+    # 函数加载配置
+    preload_functions: bool
+
+    # 日志配置
+    log_level: str
+    access_log: bool
+
+
+@cache
+def get_server_config() -> ServerConfig:
+    """读取环境变量构建服务器配置，每个进程只解析一次"""
+    host = os.getenv("HOST", "0.0.0.0")  # 监听地址
+    port = int(os.getenv("PORT", "8080"))  # 监听端口
+    return ServerConfig(
+        host=host,
+        port=port,
+        server_url=os.getenv("SERVER_URL", f"http://{host}:{port}"),  # 服务器URL
+        ssl_enabled=_env_bool("SSL_ENABLED", "false"),
+        ssl_keyfile=os.getenv("SSL_KEYFILE"),
+        ssl_certfile=os.getenv("SSL_CERTFILE"),
+        ssl_ca_certs=os.getenv("SSL_CA_CERTS"),
+        proxy_headers=_env_bool("PROXY_HEADERS", "true"),
+        trusted_hosts=_env_set("TRUSTED_HOSTS", "*"),
+        forwarded_allow_ips=_env_set("FORWARDED_ALLOW_IPS", "*"),
+        max_concurrent=int(os.getenv("MAX_CONCURRENT", "10")),
+        max_inflight=int(os.getenv("MAX_INFLIGHT", "100")),  # 每个项目进程同时执行的请求数上限
+        workers=int(os.getenv("WORKERS", "1")),
+        backlog=int(os.getenv("BACKLOG", "2048")),
+        timeout_keep_alive=int(os.getenv("TIMEOUT_KEEP_ALIVE", "5")),
+        timeout_graceful_shutdown=int(os.getenv("TIMEOUT_GRACEFUL_SHUTDOWN", "10")),
+        timeout_notify=int(os.getenv("TIMEOUT_NOTIFY", "30")),
+        cleanup_interval=int(os.getenv("CLEANUP_INTERVAL", "300")),
+        preload_functions=_env_bool("PRELOAD_FUNCTIONS", "false"),  # 项目启动时是否预先导入全部函数
+        log_level=os.getenv("LOG_LEVEL", "info"),
+        access_log=_env_bool("ACCESS_LOG", "true"),
+    )
+
+
+# 向后兼容的模块级常量，均取自缓存的配置对象
+_config = get_server_config()
 
 # 服务器配置
-HOST = os.getenv("HOST", "0.0.0.0")  # 监听地址
-PORT = int(os.getenv("PORT", "8080"))  # 监听端口
-SERVER_URL = os.getenv("SERVER_URL", f"http://{HOST}:{PORT}")  # 服务器URL
+HOST = _config.host
+PORT = _config.port
+SERVER_URL = _config.server_url
 
 # SSL配置
-SSL_ENABLED = os.getenv("SSL_ENABLED", "false").lower() == "true"
-SSL_KEYFILE = os.getenv("SSL_KEYFILE")
-SSL_CERTFILE = os.getenv("SSL_CERTFILE")
-SSL_CA_CERTS = os.getenv("SSL_CA_CERTS")
+SSL_ENABLED = _config.ssl_enabled
+SSL_KEYFILE = _config.ssl_keyfile
+SSL_CERTFILE = _config.ssl_certfile
+SSL_CA_CERTS = _config.ssl_ca_certs
 
 # 代理配置
-PROXY_HEADERS = os.getenv("PROXY_HEADERS", "true").lower() == "true"
-TRUSTED_HOSTS = os.getenv("TRUSTED_HOSTS", "*").split(",")
-FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "*").split(",")
+PROXY_HEADERS = _config.proxy_headers
+TRUSTED_HOSTS = _config.trusted_hosts
+FORWARDED_ALLOW_IPS = _config.forwarded_allow_ips
 
 # 并发配置
-MAX_CONCURRENT = int(os.getenv("MAX_CONCURRENT", "10"))
-WORKERS = int(os.getenv("WORKERS", "1"))
-BACKLOG = int(os.getenv("BACKLOG", "2048"))
+MAX_CONCURRENT = _config.max_concurrent
+MAX_INFLIGHT = _config.max_inflight
+WORKERS = _config.workers
+BACKLOG = _config.backlog
 
 # 超时配置
-TIMEOUT_KEEP_ALIVE = int(os.getenv("TIMEOUT_KEEP_ALIVE", "5"))
-TIMEOUT_GRACEFUL_SHUTDOWN = int(os.getenv("TIMEOUT_GRACEFUL_SHUTDOWN", "10"))
-TIMEOUT_NOTIFY = int(os.getenv("TIMEOUT_NOTIFY", "30"))
+TIMEOUT_KEEP_ALIVE = _config.timeout_keep_alive
+TIMEOUT_GRACEFUL_SHUTDOWN = _config.timeout_graceful_shutdown
+TIMEOUT_NOTIFY = _config.timeout_notify
 
 # 清理配置
-CLEANUP_INTERVAL = int(os.getenv("CLEANUP_INTERVAL", "300"))
+CLEANUP_INTERVAL = _config.cleanup_interval
+
+# 函数加载配置
+PRELOAD_FUNCTIONS = _config.preload_functions
 
 # 日志配置
-LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
-ACCESS_LOG = os.getenv("ACCESS_LOG", "true").lower() == "true" 
\ No newline at end of file
+LOG_LEVEL = _config.log_level
+ACCESS_LOG = _config.access_log
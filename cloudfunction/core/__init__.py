@@ -2,52 +2,71 @@
 核心功能模块
 """
 
-# 不直接导入其他模块，避免循环导入
+import importlib
+
+# 不直接导入其他模块，避免循环导入；首次访问时按需导入
+_lazy = {
+    'FunctionRegistry': '.registry',
+    'FunctionExecutor': '.executor',
+    'EnvManager': '.env',
+    'ServerState': '.state',
+    'ProjectProcess': '.project',
+    'ProjectManager': '.project',
+    'APIServer': '.server',
+    'Master': '.master',
+}
+
+def __getattr__(name):
+    """首次访问时导入并缓存到模块全局变量"""
+    module_name = _lazy.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # 写入模块全局变量后，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
+
+# 原有的工厂函数，保留供已有调用方使用（等同于直接访问同名类属性）
 
 def get_registry_class():
     """获取注册表类"""
-    from .registry import FunctionRegistry
-    return FunctionRegistry
+    return __getattr__('FunctionRegistry')
 
 def get_executor_class():
     """获取执行器类"""
-    from .executor import FunctionExecutor
-    return FunctionExecutor
+    return __getattr__('FunctionExecutor')
 
 def get_env_manager_class():
     """获取环境管理器类"""
-    from .env import EnvManager
-    return EnvManager
+    return __getattr__('EnvManager')
 
 def get_state_class():
     """获取状态管理器类"""
-    from .state import ServerState
-    return ServerState
+    return __getattr__('ServerState')
 
 def get_project_process_class():
     """获取项目进程类"""
-    from .project import ProjectProcess
-    return ProjectProcess
+    return __getattr__('ProjectProcess')
 
 def get_project_manager_class():
     """获取项目管理器类"""
-    from .project import ProjectManager
-    return ProjectManager
+    return __getattr__('ProjectManager')
 
 def get_api_server_class():
     """获取API服务器类"""
-    from .server import APIServer
-    return APIServer
+    return __getattr__('APIServer')
 
 def get_master_class():
     """获取主进程管理器类"""
-    from .master import Master
-    return Master
+    return __getattr__('Master')
 
 def get_master():
     """获取主进程实例"""
     from .state import ServerState
-    return ServerState.get_master()
+    return ServerState().get_master()
 
 __all__ = [
     # 基础组件
@@ -55,12 +74,12 @@ __all__ = [
     'FunctionExecutor',
     'EnvManager',
     'ServerState',
-    
+
     # 项目管理
     'ProjectProcess',
     'ProjectManager',
-    
+
     # API服务
     'APIServer',
     'Master',
-] 
\ No newline at end of file
+]
@@ -1,25 +1,82 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from typing import Dict, Any, List, Optional
 from cloudfunction.utils.logger import get_logger
-from cloudfunction.core.executor import FunctionExecutor
+import asyncio
 import os
-from cloudfunction.core.registry import FunctionRegistry
+from cloudfunction.core.env import PROJECTS_DIR
+from cloudfunction.core.task_manager import TaskNotFoundError, TaskNotOwnedError, TaskNotCancellableError
 import datetime
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 logger = get_logger(__name__)
 
-router = APIRouter()
+# 使用 orjson 序列化响应
+router = APIRouter(default_response_class=ORJSONResponse)
 
-@router.get("/")
+# 项目根目录（与工作目录无关）
+_PROJECTS_ROOT = Path(PROJECTS_DIR)
+
+# 读取项目文件的线程池（文件读取期间释放 GIL，可并发）
+_FILE_READ_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="project-files")
+
+# 当前时间（预先绑定，避免每次请求的属性查找）
+_now = datetime.datetime.now
+
+# 根路径的固定响应内容
+_ROOT_BYTES = orjson.dumps({
+    "service": "Cloud Function API",
+    "version": "1.0.0",
+    "status": "running"
+})
+
+# 任务列表编码选项：任务结果经 pickle 通道返回，可能含非字符串键
+_TASKS_JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _tasks_response(tasks: Any) -> Response:
+    """编码任务列表
+
+    orjson 直接编码，遇到其不支持的值（bytes、set、Decimal 等）时交给 jsonable_encoder，
+    结果与默认的 jsonable_encoder 路径一致，但不必遍历整个列表。
+    """
+    return Response(
+        content=orjson.dumps(tasks, default=jsonable_encoder, option=_TASKS_JSON_OPTIONS),
+        media_type="application/json"
+    )
+
+def get_executor_dep(project_name: str, request: Request):
+    """依赖项：获取项目执行器"""
+    try:
+        executor = request.app.state.get_executor(project_name)
+    except Exception as e:
+        logger.error("获取执行器失败: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    logger.debug("获取到执行器: %s", executor)
+    return executor
+
+def get_registry_dep(request: Request):
+    """依赖项：获取函数注册表"""
+    registry = request.app.state.get_registry()
+    if not registry:
+        raise HTTPException(status_code=500, detail="Registry not initialized")
+    return registry
+
+def get_task_manager_dep(request: Request):
+    """依赖项：获取任务管理器"""
+    task_manager = request.app.state.get_task_manager()
+    if not task_manager:
+        raise HTTPException(status_code=500, detail="Task manager not initialized")
+    return task_manager
+
+@router.get("/", response_model=None)
 async def root():
     """根路径"""
-    return {
-        "service": "Cloud Function API",
-        "version": "1.0.0",
-        "status": "running"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
-@router.get("/health")
+@router.get("/health", response_model=None)
 async def health_check(request: Request):
     """健康检查
     
@@ -34,105 +91,135 @@ async def health_check(request: Request):
         
         # 获取项目状态
         registry = request.app.state.get_registry()
-        projects = registry.list_projects() if registry else []
+        projects_count = registry.project_count() if registry else 0
         
         return {
             "status": "healthy",
             "master": master is not None,
-            "projects": len(projects),
-            "timestamp": datetime.datetime.now().isoformat()
+            "projects": projects_count,
+            "timestamp": _now().isoformat()
         }
     except Exception as e:
-        logger.error(f"健康检查失败: {str(e)}", exc_info=True)
+        logger.error("健康检查失败: %s", e, exc_info=True)
         return {
             "status": "unhealthy",
             "error": str(e),
-            "timestamp": datetime.datetime.now().isoformat()
+            "timestamp": _now().isoformat()
         }
 
-def get_project_files(project_name: str, function_name: str = None) -> Dict[str, List[bytes]]:
-    """
-    自动查找项目目录下的必要文件
-    
-    Args:
-        project_name: 项目名称
-        function_name: 可选的函数名称，如果提供则只返回该函数的文件
-        
-    Returns:
-        包含代码文件和依赖文件内容的字典
-    """
-    project_path = f"cloudfunction/projects/{project_name}"
-    code_files = []
-    requirements_file = os.path.join(project_path, "requirements.txt")
+def _read_file(path: Path) -> bytes:
+    """读取文件全部内容（无缓冲，单次 read）"""
+    with open(path, 'rb', buffering=0) as f:
+        return f.read()
+
+def _project_fingerprint(project_path: Path) -> tuple:
+    """项目目录指纹：(文件名, 修改时间) 列表，任一文件变化都会改变指纹"""
+    with os.scandir(project_path) as it:
+        return tuple(sorted((entry.name, entry.stat().st_mtime_ns) for entry in it if entry.is_file()))
+
+def _read_project_files(project_name: str, function_name: Optional[str], fingerprint: tuple) -> Dict[str, List[bytes]]:
+    """读取项目文件"""
+    project_path = _PROJECTS_ROOT / project_name
+    requirements_file = project_path / "requirements.txt"
     
     if function_name:
         # 如果指定了函数名，只查找该函数的文件
-        function_file = os.path.join(project_path, f"{function_name}.py")
-        if not os.path.exists(function_file):
+        function_file = project_path / f"{function_name}.py"
+        if not function_file.exists():
             raise FileNotFoundError(f"函数文件 {function_file} 不存在")
-        with open(function_file, 'rb') as f:
-            code_files.append(f.read())
+        paths = [function_file]
     else:
-        # 否则查找所有 .py 文件
-        for file in os.listdir(project_path):
-            if file.endswith(".py"):
-                with open(os.path.join(project_path, file), 'rb') as f:
-                    code_files.append(f.read())
+        # 否则查找所有 .py 文件（指纹中已包含目录下的文件名）
+        paths = [project_path / name for name, _ in fingerprint if name.endswith(".py")]
     
-    if not code_files:
+    if not paths:
         raise FileNotFoundError(f"项目 {project_name} 中没有找到 .py 文件")
-    if not os.path.exists(requirements_file):
+    if not requirements_file.exists():
         raise FileNotFoundError(f"依赖文件 {requirements_file} 不存在")
     
+    # 并发读取所有文件，耗时取决于最慢的文件而非总和
+    *code_files, requirements = _FILE_READ_POOL.map(_read_file, [*paths, requirements_file])
     return {
         "code_files": code_files,
-        "requirements": open(requirements_file, 'rb').read()
+        "requirements": requirements
     }
 
-@router.post("/api/v1/projects/{project_name}/deploy")
-async def deploy_project(project_name: str, request: Request):
+# 项目文件缓存: {(项目名, 函数名): (目录指纹, 文件内容)}，每个键只保留最新版本
+_project_files_cache: Dict[tuple, tuple] = {}
+
+def _load_project_files(project_name: str, function_name: str = None) -> Dict[str, List[bytes]]:
+    """同步读取项目文件，由 get_project_files 放到线程中执行
+    
+    按目录指纹缓存，文件未变化时直接返回上次结果；文件变化后新内容替换旧条目，
+    不保留旧版本的文件内容。
+    """
+    key = (project_name, function_name)
+    try:
+        fingerprint = _project_fingerprint(_PROJECTS_ROOT / project_name)
+        cached = _project_files_cache.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        files = _read_project_files(project_name, function_name, fingerprint)
+    except FileNotFoundError:
+        # 项目或文件已删除，丢弃缓存
+        _project_files_cache.pop(key, None)
+        raise
+    _project_files_cache[key] = (fingerprint, files)
+    return files
+
+async def get_project_files(project_name: str, function_name: str = None) -> Dict[str, List[bytes]]:
+    """
+    自动查找项目目录下的必要文件
+    
+    文件读取在线程中进行，不阻塞事件循环
+    
+    Args:
+        project_name: 项目名称
+        function_name: 可选的函数名称，如果提供则只返回该函数的文件
+        
+    Returns:
+        包含代码文件和依赖文件内容的字典
+    """
+    return await asyncio.to_thread(_load_project_files, project_name, function_name)
+
+@router.post("/api/v1/projects/{project_name}/deploy", response_model=None)
+async def deploy_project(project_name: str, executor=Depends(get_executor_dep)):
     """部署整个项目
     
     Args:
         project_name: 项目名称
-        request: 请求对象
+        executor: 项目执行器
     """
-    logger.info(f"收到项目部署请求: {project_name}")
+    logger.info("收到项目部署请求: %s", project_name)
     try:
-        # 获取执行器
-        executor = request.app.state.get_executor(project_name)
-        logger.debug(f"获取到执行器: {executor}")
-        
         # 部署项目
         result = await executor.deploy_project(project_name)
-        logger.info(f"项目部署完成: {result}")
+        logger.info("项目部署完成: %s", result)
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"项目部署失败: {str(e)}")
+        logger.error("项目部署失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/api/v1/functions/{project_name}/{function_name}/deploy")
+@router.post("/api/v1/functions/{project_name}/{function_name}/deploy", response_model=None)
 async def deploy_function(
     project_name: str,
     function_name: str,
-    request: Request
+    executor=Depends(get_executor_dep)
 ):
     """部署特定函数
     
     Args:
         project_name: 项目名称
         function_name: 函数名称
-        request: 请求对象
+        executor: 项目执行器
     """
-    logger.info(f"收到函数部署请求: project={project_name}, function={function_name}")
+    logger.info("收到函数部署请求: project=%s, function=%s", project_name, function_name)
     try:
         # 自动查找特定函数文件
-        project_files = get_project_files(project_name, function_name)
-        
-        # 获取执行器
-        executor = request.app.state.get_executor(project_name)
-        logger.debug(f"获取到执行器: {executor}")
+        project_files = await get_project_files(project_name, function_name)
         
         # 部署特定函数
         result = await executor.deploy_function(
@@ -140,18 +227,21 @@ async def deploy_function(
             code=project_files["code_files"][0],  # 使用函数对应的文件内容
             requirements=project_files["requirements"]
         )
-        logger.info(f"函数部署成功: {result}")
+        logger.info("函数部署成功: %s", result)
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"函数部署失败: {str(e)}")
+        logger.error("函数部署失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/api/v1/functions/{project_name}/{function_name}/invoke")
+@router.post("/api/v1/functions/{project_name}/{function_name}/invoke", response_model=None)
 async def invoke_function_api(
     project_name: str,
     function_name: str,
-    request: Request
+    request: Request,
+    task_manager=Depends(get_task_manager_dep)
 ):
     """调用函数（异步）
     
@@ -159,115 +249,95 @@ async def invoke_function_api(
         project_name: 项目名称
         function_name: 函数名称
         request: 请求对象
+        task_manager: 任务管理器
     """
-    logger.info(f"收到函数调用请求: project={project_name}, function={function_name}")
+    logger.info("收到函数调用请求: project=%s, function=%s", project_name, function_name)
     try:
         # 获取请求体
         payload = await request.json()
         
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
         # 创建任务
         task_info = await task_manager.create_task(project_name, function_name, payload)
-        logger.info(f"任务创建成功: {task_info['task_id']}")
+        logger.info("任务创建成功: %s", task_info['task_id'])
         return {
             "status": "success",
             "task_id": task_info["task_id"],
             "message": "Task created successfully"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"函数调用失败: {str(e)}")
+        logger.error("函数调用失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/api/v1/functions/{project_name}")
-async def list_functions(project_name: str, request: Request):
+@router.get("/api/v1/functions/{project_name}", response_model=None)
+async def list_functions(project_name: str, executor=Depends(get_executor_dep)):
     """获取函数列表
     
     Args:
         project_name: 项目名称
-        request: 请求对象
+        executor: 项目执行器
     """
-    logger.info(f"收到函数列表请求: project={project_name}")
+    logger.info("收到函数列表请求: project=%s", project_name)
     try:
-        executor = request.app.state.get_executor(project_name)
-        logger.debug(f"获取到执行器: {executor}")
-        
         functions = await executor.list_functions()
-        logger.info(f"获取函数列表成功: {len(functions)} 个函数")
+        logger.info("获取函数列表成功: %d 个函数", len(functions))
         return functions
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取函数列表失败: {str(e)}")
+        logger.error("获取函数列表失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/api/v1/functions/{project_name}/{function_name}")
-async def delete_function(project_name: str, function_name: str, request: Request):
+@router.delete("/api/v1/functions/{project_name}/{function_name}", response_model=None)
+async def delete_function(project_name: str, function_name: str, registry=Depends(get_registry_dep)):
     """删除函数"""
-    logger.info(f"收到函数删除请求: project={project_name}, function={function_name}")
+    logger.info("收到函数删除请求: project=%s, function=%s", project_name, function_name)
     try:
-        # 通过 state 获取 registry
-        registry = request.app.state.get_registry()
-        if not registry:
-            raise HTTPException(status_code=500, detail="Registry not initialized")
-            
         # 使用 registry 的删除方法
         success = await registry.delete_function(project_name, function_name)
         if not success:
             raise HTTPException(status_code=404, detail=f"函数 {function_name} 不存在")
             
-        logger.info(f"函数删除成功: {function_name}")
+        logger.info("函数删除成功: %s", function_name)
         return {"message": f"函数 {function_name} 已成功删除"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"函数删除失败: {str(e)}")
+        logger.error("函数删除失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/api/v1/projects/{project_name}")
-async def delete_project(project_name: str, request: Request):
+@router.delete("/api/v1/projects/{project_name}", response_model=None)
+async def delete_project(project_name: str, registry=Depends(get_registry_dep)):
     """删除项目"""
-    logger.info(f"收到项目删除请求: project={project_name}")
+    logger.info("收到项目删除请求: project=%s", project_name)
     try:
-        # 通过 state 获取 registry
-        registry = request.app.state.get_registry()
-        if not registry:
-            raise HTTPException(status_code=500, detail="Registry not initialized")
-            
         success = await registry.delete_project(project_name)
         if not success:
             raise HTTPException(status_code=404, detail=f"项目 {project_name} 不存在")
             
-        logger.info(f"项目删除成功: {project_name}")
+        logger.info("项目删除成功: %s", project_name)
         return {"message": f"项目 {project_name} 已成功删除"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"项目删除失败: {str(e)}")
+        logger.error("项目删除失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/api/v1/tasks/{task_id}")
-async def get_task_status(task_id: str, request: Request):
+@router.get("/api/v1/tasks/{task_id}", response_model=None)
+async def get_task_status(task_id: str, task_manager=Depends(get_task_manager_dep)):
     """获取任务状态
     
     Args:
         task_id: 任务ID
-        request: 请求对象
+        task_manager: 任务管理器
     """
-    logger.info(f"收到任务状态查询请求: task_id={task_id}")
+    logger.info("收到任务状态查询请求: task_id=%s", task_id)
     try:
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
         # 获取任务状态
         task_info = await task_manager.get_task_status(task_id)
         if not task_info:
@@ -278,54 +348,42 @@ async def get_task_status(task_id: str, request: Request):
             
         return task_info
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取任务状态失败: {str(e)}")
+        logger.error("获取任务状态失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/api/v1/tasks")
-async def list_tasks(request: Request, status: Optional[str] = None):
+@router.get("/api/v1/tasks", response_model=None)
+async def list_tasks(status: Optional[str] = None, task_manager=Depends(get_task_manager_dep)):
     """获取任务列表
     
     Args:
-        request: 请求对象
         status: 可选的过滤状态
+        task_manager: 任务管理器
     """
-    logger.info(f"收到任务列表请求: status={status}")
+    logger.info("收到任务列表请求: status=%s", status)
     try:
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
         # 获取任务列表
-        tasks = await task_manager.list_tasks(status)
-        return tasks
+        tasks = await task_manager.list_tasks(status=status)
+        return _tasks_response(tasks)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取任务列表失败: {str(e)}")
+        logger.error("获取任务列表失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/api/v1/tasks/{task_id}")
-async def cancel_task(task_id: str, request: Request):
+@router.delete("/api/v1/tasks/{task_id}", response_model=None)
+async def cancel_task(task_id: str, task_manager=Depends(get_task_manager_dep)):
     """取消任务
     
     Args:
         task_id: 任务ID
-        request: 请求对象
+        task_manager: 任务管理器
     """
-    logger.info(f"收到任务取消请求: task_id={task_id}")
+    logger.info("收到任务取消请求: task_id=%s", task_id)
     try:
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
         # 取消任务
         success = await task_manager.cancel_task(task_id)
         if not success:
@@ -336,54 +394,49 @@ async def cancel_task(task_id: str, request: Request):
             
         return {"message": f"Task {task_id} cancelled successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"取消任务失败: {str(e)}")
+        logger.error("取消任务失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/api/v1/functions/{project_name}/{function_name}/tasks")
+@router.get("/api/v1/functions/{project_name}/{function_name}/tasks", response_model=None)
 async def list_function_tasks(
     project_name: str,
     function_name: str,
-    request: Request,
-    status: Optional[str] = None
+    status: Optional[str] = None,
+    task_manager=Depends(get_task_manager_dep)
 ):
     """获取特定函数的所有任务
     
     Args:
         project_name: 项目名称
         function_name: 函数名称
-        request: 请求对象
         status: 可选的过滤状态
+        task_manager: 任务管理器
     """
-    logger.info(f"收到函数任务列表请求: project={project_name}, function={function_name}")
+    logger.info("收到函数任务列表请求: project=%s, function=%s", project_name, function_name)
     try:
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
-        # 获取任务列表
-        tasks = await task_manager.list_tasks(status)
-        # 过滤特定函数的任务
-        function_tasks = [
-            task for task in tasks 
-            if task["project_name"] == project_name and task["function_name"] == function_name
-        ]
-        return function_tasks
+        # 获取特定函数的任务列表（由任务管理器按索引过滤）
+        tasks = await task_manager.list_tasks(
+            project_name=project_name,
+            status=status,
+            function_name=function_name
+        )
+        return _tasks_response(tasks)
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取函数任务列表失败: {str(e)}")
+        logger.error("获取函数任务列表失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/api/v1/functions/{project_name}/{function_name}/tasks/{task_id}")
+@router.get("/api/v1/functions/{project_name}/{function_name}/tasks/{task_id}", response_model=None)
 async def get_function_task(
     project_name: str,
     function_name: str,
     task_id: str,
-    request: Request
+    task_manager=Depends(get_task_manager_dep)
 ):
     """获取特定函数的任务状态
     
@@ -391,18 +444,10 @@ async def get_function_task(
         project_name: 项目名称
         function_name: 函数名称
         task_id: 任务ID
-        request: 请求对象
+        task_manager: 任务管理器
     """
-    logger.info(f"收到函数任务状态查询请求: project={project_name}, function={function_name}, task_id={task_id}")
+    logger.info("收到函数任务状态查询请求: project=%s, function=%s, task_id=%s", project_name, function_name, task_id)
     try:
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
         # 获取任务状态
         task_info = await task_manager.get_task_status(task_id)
         if not task_info:
@@ -420,16 +465,18 @@ async def get_function_task(
             
         return task_info
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"获取函数任务状态失败: {str(e)}")
+        logger.error("获取函数任务状态失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.delete("/api/v1/functions/{project_name}/{function_name}/tasks/{task_id}")
+@router.delete("/api/v1/functions/{project_name}/{function_name}/tasks/{task_id}", response_model=None)
 async def cancel_function_task(
     project_name: str,
     function_name: str,
     task_id: str,
-    request: Request
+    task_manager=Depends(get_task_manager_dep)
 ):
     """取消特定函数的任务
     
@@ -437,45 +484,24 @@ async def cancel_function_task(
         project_name: 项目名称
         function_name: 函数名称
         task_id: 任务ID
-        request: 请求对象
+        task_manager: 任务管理器
     """
-    logger.info(f"收到函数任务取消请求: project={project_name}, function={function_name}, task_id={task_id}")
+    logger.info("收到函数任务取消请求: project=%s, function=%s, task_id=%s", project_name, function_name, task_id)
     try:
-        # 获取任务管理器
-        task_manager = request.app.state.get_task_manager()
-        if not task_manager:
-            raise HTTPException(
-                status_code=500,
-                detail="Task manager not initialized"
-            )
-            
-        # 获取任务状态
-        task_info = await task_manager.get_task_status(task_id)
-        if not task_info:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Task {task_id} not found"
-            )
-            
-        # 验证任务是否属于指定的函数
-        if task_info["project_name"] != project_name or task_info["function_name"] != function_name:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Task {task_id} does not belong to function {function_name}"
-            )
-            
-        # 取消任务
-        success = await task_manager.cancel_task(task_id)
-        if not success:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Task {task_id} cannot be cancelled"
-            )
+        # 校验归属并取消任务（原子操作）
+        try:
+            await task_manager.cancel_task_for_function(task_id, project_name, function_name)
+        except (TaskNotFoundError, TaskNotOwnedError) as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        except TaskNotCancellableError as e:
+            raise HTTPException(status_code=400, detail=str(e))
             
         return {"message": f"Task {task_id} cancelled successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"取消函数任务失败: {str(e)}")
+        logger.error("取消函数任务失败: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 logger.info("API路由设置完成") 
\ No newline at end of file
@@ -0,0 +1,305 @@
+"""
+进程间消息通道
+"""
+
+import pickle
+import orjson
+from multiprocessing import Pipe, Queue, SimpleQueue
+from multiprocessing.shared_memory import SharedMemory
+from queue import Empty
+from typing import Any, Optional, Union
+
+# 序列化后达到该大小（字节）的消息经共享内存传递
+SHM_THRESHOLD = 1 << 20
+
+# 达到该大小（字节）的 bytes 字段作为带外缓冲区传递
+OOB_THRESHOLD = 64 * 1024
+
+def wrap_large_buffers(value: Any) -> Any:
+    """将大 bytes 值（含 dict/list/tuple 第一层中的值）包装为 PickleBuffer
+
+    协议 5 序列化时 PickleBuffer 作为带外缓冲区单独成帧，大消息经共享内存时
+    直接写入共享内存，不再先复制进 pickle 数据流；接收方得到的仍是 bytes。
+
+    Args:
+        value: 待发送的值
+
+    Returns:
+        包装后的值，无需包装时原样返回
+    """
+    if isinstance(value, bytes):
+        return pickle.PickleBuffer(value) if len(value) >= OOB_THRESHOLD else value
+    if isinstance(value, dict):
+        return {
+            key: pickle.PickleBuffer(item) if isinstance(item, bytes) and len(item) >= OOB_THRESHOLD else item
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return type(value)(
+            pickle.PickleBuffer(item) if isinstance(item, bytes) and len(item) >= OOB_THRESHOLD else item
+            for item in value
+        )
+    return value
+
+# orjson 的最大嵌套深度，更深的消息改用 pickle
+_JSON_MAX_DEPTH = 254
+
+def _is_json_native(value: Any, depth: int = 0) -> bool:
+    """值是否能经 JSON 原样往返
+
+    只接受 dict（键为 str）、list、str、int、有限 float、bool 和 None，按精确类型判断。
+    tuple、子类、datetime、UUID、dataclass、NaN/inf 等 orjson 虽能编码但解码后
+    类型或取值会改变，均返回 False。
+    """
+    cls = type(value)
+    if cls is str or cls is int or cls is bool or value is None:
+        return True
+    if cls is float:
+        # NaN 和 ±inf 相减得到 NaN
+        return value - value == 0.0
+    if depth >= _JSON_MAX_DEPTH:
+        return False
+    if cls is dict:
+        depth += 1
+        for key, item in value.items():
+            if type(key) is not str or not _is_json_native(item, depth):
+                return False
+        return True
+    if cls is list:
+        depth += 1
+        for item in value:
+            if not _is_json_native(item, depth):
+                return False
+        return True
+    return False
+
+class SpscQueue:
+    """单生产者、单消费者的单向管道队列
+
+    put/get 不获取跨进程锁，直接读写管道，因此同一时刻只能有一个线程写入、一个线程读取，
+    否则消息可能交错损坏。项目响应队列满足这一条件：
+    - 写入方：项目进程的主线程（事件循环中的各请求任务，以及事件循环退出后的异常处理），
+      主进程只在项目进程终止后写入唤醒用的 None；
+    - 读取方：主进程中该项目唯一的响应读取线程。
+    """
+
+    def __init__(self):
+        self._reader, self._writer = Pipe(duplex=False)
+        self.put = self._writer.send
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """接收消息
+
+        Args:
+            block: 是否阻塞等待
+            timeout: 超时时间（秒），超时抛出 queue.Empty
+
+        Returns:
+            接收到的对象
+        """
+        if not block:
+            timeout = 0
+        if timeout is not None and not self._reader.poll(timeout):
+            raise Empty
+        return self._reader.recv()
+
+    def empty(self) -> bool:
+        """队列是否为空"""
+        return not self._reader.poll()
+
+    def close(self) -> None:
+        """关闭管道两端"""
+        self._reader.close()
+        self._writer.close()
+
+class ReadySignal:
+    """进程就绪信号
+
+    在多进程 Event 之外附带一条单向管道：set 时同时向管道写入一个字节，等待方可把读端
+    注册到事件循环（add_reader），不必占用线程阻塞等待或按固定间隔轮询。
+    创建方启动子进程后调用 close_writer 关闭自己持有的写端，子进程未就绪即退出时
+    读端读到 EOF 同样变为可读，等待方再用 is_set 区分两种情况。
+    """
+
+    def __init__(self, event):
+        """初始化就绪信号
+
+        Args:
+            event: 多进程 Event，与子进程使用同一启动方式的上下文创建
+        """
+        self._event = event
+        self._reader, self._writer = Pipe(duplex=False)
+
+    def set(self) -> None:
+        """标记就绪并唤醒等待方"""
+        self._event.set()
+        try:
+            self._writer.send_bytes(b"1")
+        except OSError:
+            # 本进程已关闭写端
+            pass
+
+    def is_set(self) -> bool:
+        """是否已就绪"""
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """阻塞等待就绪，返回是否已就绪"""
+        return self._event.wait(timeout)
+
+    def clear(self) -> None:
+        """清除就绪标记"""
+        self._event.clear()
+
+    def fileno(self) -> int:
+        """管道读端的文件描述符，就绪或子进程退出后可读"""
+        return self._reader.fileno()
+
+    def close_writer(self) -> None:
+        """关闭本进程持有的写端（创建方在子进程启动后调用）"""
+        self._writer.close()
+
+    def close(self) -> None:
+        """关闭管道两端"""
+        self._reader.close()
+        self._writer.close()
+
+class ShmChannel:
+    """基于 multiprocessing.Queue 的消息通道
+
+    只由 JSON 原生类型组成、可原样往返的小消息（请求参数、函数返回值的常见情况）使用 orjson 序列化；
+    其余消息使用 pickle 协议 5 序列化，带外缓冲区（bytearray、ndarray 等）单独成帧。
+    小消息直接经队列传递；大消息的各帧写入一块共享内存，队列中只传递
+    (共享内存名, 各帧长度)，避免大数据经管道分块拷贝。接收方读取后释放共享内存。
+
+    提供与 Queue 相同的 put/get/empty/close 接口，可直接替换项目队列。
+    """
+
+    def __init__(self, queue: Optional[Union[Queue, SimpleQueue, SpscQueue]] = None):
+        """初始化消息通道
+
+        Args:
+            queue: 底层队列，为空时新建 Queue。单生产者、且接收方持续读取的方向
+                可传入 SimpleQueue：put 直接写管道，省去 Queue 的后台发送线程；
+                只有一个写进程和一个读线程时可传入 SpscQueue，读写均不加锁
+        """
+        self._queue = queue if queue is not None else Queue()
+
+    def put(self, message: Any) -> None:
+        """发送消息
+
+        Args:
+            message: 可 pickle 的消息对象
+        """
+        # 含 bytes、tuple、datetime、NaN 等经 JSON 无法原样往返的内容时改用 pickle
+        if _is_json_native(message):
+            try:
+                data = orjson.dumps(message)
+            except TypeError:
+                # 超出 64 位的整数
+                pass
+            else:
+                if len(data) < SHM_THRESHOLD:
+                    self._queue.put((None, data, None))
+                    return
+        
+        buffers = []
+        data = pickle.dumps(message, protocol=5, buffer_callback=buffers.append)
+        frames = [data] + [buffer.raw() for buffer in buffers]
+        sizes = [len(frame) for frame in frames]
+
+        if sum(sizes) < SHM_THRESHOLD:
+            self._queue.put((None, data, [bytes(frame) for frame in frames[1:]]))
+            return
+
+        shm = SharedMemory(create=True, size=sum(sizes))
+        try:
+            offset = 0
+            for frame, size in zip(frames, sizes):
+                shm.buf[offset:offset + size] = frame
+                offset += size
+        except BaseException:
+            shm.close()
+            shm.unlink()
+            raise
+        shm.close()
+        # 共享内存正常由接收方读取后释放（unlink 时从 resource_tracker 注销）。发送方保留登记：
+        # 主进程在 fork 项目进程前已启动 resource_tracker，各进程共用同一个，
+        # 接收方未读取即退出时，段仍由 resource_tracker 在主进程退出时释放
+        self._queue.put((shm.name, None, sizes))
+
+    def get(self, block: bool = True, timeout: Optional[float] = None) -> Any:
+        """接收消息
+
+        Args:
+            block: 是否阻塞等待
+            timeout: 超时时间（秒），超时抛出 queue.Empty
+
+        Returns:
+            反序列化后的消息对象
+        """
+        # JSON 小消息: (None, JSON 数据, None)；pickle 小消息: (None, 数据帧, 带外缓冲区列表)；
+        # 大消息: (共享内存名, None, 各帧长度)
+        if block and timeout is None:
+            item = self._queue.get()
+        else:
+            item = self._queue.get(block, timeout)
+        name, data, extra = item
+        if name is None:
+            if extra is None:
+                return orjson.loads(data)
+            return pickle.loads(data, buffers=extra)
+        sizes = extra
+
+        shm = SharedMemory(name=name)
+        try:
+            # 带外缓冲区复制出来，使结果不引用即将释放的共享内存
+            buffers = []
+            offset = sizes[0]
+            for size in sizes[1:]:
+                buffers.append(bytes(shm.buf[offset:offset + size]))
+                offset += size
+            frame = shm.buf[:sizes[0]]
+            try:
+                return pickle.loads(frame, buffers=buffers)
+            finally:
+                frame.release()
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def discard_pending(self) -> int:
+        """丢弃队列中尚未读取的消息，并释放其中大消息占用的共享内存
+
+        接收方进程已退出（项目进程被终止或重启）时由主进程调用，否则这些共享内存段
+        无人释放。只能在没有其他线程读取该队列时调用。
+
+        Returns:
+            int: 丢弃的消息数
+        """
+        count = 0
+        while True:
+            try:
+                name, _, _ = self._queue.get(False)
+            except (Empty, EOFError, OSError, ValueError):
+                return count
+            count += 1
+            if name is not None:
+                try:
+                    shm = SharedMemory(name=name)
+                except FileNotFoundError:
+                    continue
+                shm.close()
+                shm.unlink()
+
+    def fileno(self) -> int:
+        """底层队列读端的文件描述符，可注册到事件循环（add_reader）等待消息到达"""
+        return self._queue._reader.fileno()
+
+    def empty(self) -> bool:
+        """队列是否为空"""
+        return self._queue.empty()
+
+    def close(self) -> None:
+        """关闭底层队列"""
+        self._queue.close()
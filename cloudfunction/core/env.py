@@ -1,6 +1,12 @@
 import os
-from typing import Dict, Any
-from dotenv import load_dotenv
+import re
+import shutil
+import subprocess
+import sys
+from collections import ChainMap
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Any, Mapping, MutableMapping, Optional, Tuple
 from cloudfunction.utils.logger import get_logger
 
 # 设置日志
@@ -17,9 +23,121 @@ SYSTEM_VENV_DIR = os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), "clou
 # 日志目录
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 
+# 虚拟环境内可执行文件的相对位置（按平台一次性确定）
+VENV_BIN_DIR = "Scripts" if os.name == "nt" else "bin"
+VENV_PYTHON_EXE = "python.exe" if os.name == "nt" else "python"
+VENV_PIP_EXE = "pip.exe" if os.name == "nt" else "pip"
+
+# pip install 公共参数：不交互、不检查 pip 新版本，所有虚拟环境共用同一个 wheel 缓存
+PIP_CACHE_DIR = os.getenv("PIP_CACHE_DIR", os.path.join(VENVS_DIR, ".pip-cache"))
+PIP_INSTALL_FLAGS = ("--no-input", "--disable-pip-version-check", "--cache-dir", PIP_CACHE_DIR)
+
+# 按依赖集合哈希分目录的本地 wheel 仓库，依赖相同的项目离线安装
+WHEELHOUSE_DIR = os.path.join(VENVS_DIR, "_wheelhouse")
+
 SYSTEM_ENV_PATH = os.path.join(BASE_DIR, ".env")
 SYSTEM_REQUIREMENTS_PATH = os.path.join(BASE_DIR, "requirements.txt")
 
+def _parse_env_lines(content: str, strict: bool = True) -> Optional[Dict[str, str]]:
+    """按内置规则解析 .env 内容
+    
+    支持 KEY=VALUE、export 前缀、# 注释、单行成对引号，以及未加引号值后的行内注释。
+    
+    Args:
+        content: 文件内容
+        strict: 为 True 时遇到不支持的写法（${VAR} 插值、引号内反斜杠转义、
+            未在同一行闭合的引号）返回 None；为 False 时按字面值解析
+        
+    Returns:
+        Optional[Dict[str, str]]: 环境变量字典
+    """
+    env = {}
+    for line in content.splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if line.startswith("export "):
+            line = line[7:].lstrip()
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        key = key.strip()
+        value = value.strip()
+        quote = value[:1]
+        if quote in ("'", '"'):
+            if len(value) < 2 or value[-1] != quote:
+                if strict:
+                    return None
+            else:
+                value = value[1:-1]
+                if strict and ("\\" in value or (quote == '"' and "${" in value)):
+                    return None
+        else:
+            value = value.split(" #", 1)[0].rstrip()
+            if strict and "${" in value:
+                return None
+        env[key] = value
+    return env
+
+def _parse_env_file(path: str) -> Dict[str, str]:
+    """解析 .env 文件为字典，不修改 os.environ
+    
+    常见写法由内置规则直接解析；文件中出现内置规则不支持的写法（${VAR} 插值、
+    引号内转义、多行引号值）时，整个文件改用 python-dotenv 的 dotenv_values 解析，
+    取值与原先的 load_dotenv 一致。
+    
+    Args:
+        path: .env 文件路径
+        
+    Returns:
+        Dict[str, str]: 环境变量字典
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    
+    env = _parse_env_lines(content)
+    if env is not None:
+        return env
+    try:
+        from dotenv import dotenv_values
+    except ImportError:
+        logger.warning(f"{path} 使用了插值、转义或多行值，未安装 python-dotenv，按字面值解析")
+        return _parse_env_lines(content, strict=False)
+    # 没有 "=" 的行 dotenv 解析为 None，load_dotenv 会跳过
+    return {key: value for key, value in dotenv_values(path).items() if value is not None}
+
+@lru_cache(maxsize=1)
+def _parse_system_env(path: str, mtime: float) -> Mapping[str, str]:
+    """解析系统级 .env 为只读映射，不修改 os.environ
+    
+    按 (路径, 修改时间) 缓存，文件未变化时直接复用上次结果。
+    """
+    return MappingProxyType(_parse_env_file(path))
+
+# requirements 文件中的有效行：去除首尾空白，跳过空行和注释行
+_REQUIREMENT_LINE_RE = re.compile(r"(?m)^[ \t]*([^#\s][^\n]*?)[ \t\r]*$")
+
+@lru_cache(maxsize=64)
+def _parse_requirements(path: str, mtime: int) -> Tuple[str, ...]:
+    """解析 requirements 文件为依赖行（去除空行和注释行），按 (路径, 修改时间) 缓存"""
+    with open(path, "r") as f:
+        return tuple(_REQUIREMENT_LINE_RE.findall(f.read()))
+
+def read_requirements(path: str) -> Tuple[str, ...]:
+    """读取 requirements 文件，文件未变化时直接复用上次解析结果
+    
+    Args:
+        path: 依赖文件路径
+        
+    Returns:
+        Tuple[str, ...]: 依赖行，文件不存在时为空
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return ()
+    return _parse_requirements(path, mtime)
+
 class EnvManager:
     """环境变量管理器"""
     
@@ -31,24 +149,34 @@ class EnvManager:
 
     def _load_system_env(self):
         """加载系统级环境变量"""
-        system_env_path = os.path.join(BASE_DIR, ".env")
-        if os.path.exists(system_env_path):
-            load_dotenv(system_env_path)
-            # 读取所有系统环境变量
-            for key, value in os.environ.items():
-                self.system_env[key] = value
+        try:
+            mtime = os.path.getmtime(SYSTEM_ENV_PATH)
+        except OSError:
+            mtime = None
+        if mtime is not None:
+            # 与 load_dotenv 一致：已存在的进程环境变量优先，.env 中的值只作补充
+            self.system_env = ChainMap(os.environ, _parse_system_env(SYSTEM_ENV_PATH, mtime))
             logger.info("Loaded system environment variables")
         else:
             logger.warning(f"System environment file not found at {SYSTEM_ENV_PATH}")
 
-    def get_project_env(self, project_name: str) -> Dict[str, str]:
+    def apply_system_env(self):
+        """将系统级 .env 写入当前进程的 os.environ（已存在的变量优先，与 load_dotenv 一致）
+        
+        主进程启动时调用一次，主进程中经 os.getenv 读取的配置（数据库、LLM 客户端等）
+        以及之后 fork 出的项目进程都能读到 .env 中的值。
+        """
+        for key, value in self.system_env.items():
+            os.environ.setdefault(key, value)
+
+    def get_project_env(self, project_name: str) -> MutableMapping[str, str]:
         """获取项目环境变量
         
         Args:
             project_name: 项目名称
             
         Returns:
-            Dict[str, str]: 项目环境变量
+            MutableMapping[str, str]: 项目环境变量（项目级在前、系统级在后的分层映射）
         """
         if project_name not in self.project_envs:
             self._load_project_env(project_name)
@@ -60,29 +188,16 @@ class EnvManager:
         Args:
             project_name: 项目名称
         """
-        # 首先复制系统环境变量
-        project_env = self.system_env.copy()
+        overrides = {}
         
-        # 加载项目级环境变量
+        # 加载项目级环境变量（直接解析文件，不修改 os.environ）
         project_env_path = os.path.join(PROJECTS_DIR, project_name, ".env")
         if os.path.exists(project_env_path):
-            # 临时保存当前环境变量
-            current_env = os.environ.copy()
-            
-            # 加载项目环境变量
-            load_dotenv(project_env_path)
-            
-            # 更新项目环境变量
-            for key, value in os.environ.items():
-                project_env[key] = value
-            
-            # 恢复系统环境变量
-            os.environ.clear()
-            os.environ.update(current_env)
-            
+            overrides = _parse_env_file(project_env_path)
             logger.info(f"Loaded environment variables for project {project_name}")
         
-        self.project_envs[project_name] = project_env
+        # 项目级覆盖系统级，系统环境变量共享而不复制；后续更新只写入项目级
+        self.project_envs[project_name] = ChainMap(overrides, self.system_env)
 
     def clear_project_env(self, project_name: str):
         """清除项目环境变量
@@ -129,6 +244,7 @@ class EnvManager:
         return SYSTEM_VENV_DIR
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_venv_python(project_name: str) -> str:
         """获取项目的虚拟环境 Python 解释器路径
         
@@ -139,10 +255,7 @@ class EnvManager:
             Python 解释器路径
         """
         venv_path = EnvManager.get_venv_path(project_name)
-        if os.name == "nt":  # Windows
-            return os.path.join(venv_path, "Scripts", "python.exe")
-        else:  # Unix-like
-            return os.path.join(venv_path, "bin", "python")
+        return os.path.join(venv_path, VENV_BIN_DIR, VENV_PYTHON_EXE)
 
     @staticmethod
     def get_system_venv_python() -> str:
@@ -152,12 +265,10 @@ class EnvManager:
             系统级 Python 解释器路径
         """
         venv_path = EnvManager.get_system_venv_path()
-        if os.name == "nt":  # Windows
-            return os.path.join(venv_path, "Scripts", "python.exe")
-        else:  # Unix-like
-            return os.path.join(venv_path, "bin", "python")
+        return os.path.join(venv_path, VENV_BIN_DIR, VENV_PYTHON_EXE)
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_venv_pip(project_name: str) -> str:
         """获取项目的虚拟环境 pip 路径
         
@@ -168,10 +279,7 @@ class EnvManager:
             pip 路径
         """
         venv_path = EnvManager.get_venv_path(project_name)
-        if os.name == "nt":  # Windows
-            return os.path.join(venv_path, "Scripts", "pip.exe")
-        else:  # Unix-like
-            return os.path.join(venv_path, "bin", "pip")
+        return os.path.join(venv_path, VENV_BIN_DIR, VENV_PIP_EXE)
 
     @staticmethod
     def get_system_venv_pip() -> str:
@@ -181,10 +289,121 @@ class EnvManager:
             系统级 pip 路径
         """
         venv_path = EnvManager.get_system_venv_path()
-        if os.name == "nt":  # Windows
-            return os.path.join(venv_path, "Scripts", "pip.exe")
-        else:  # Unix-like
-            return os.path.join(venv_path, "bin", "pip")
+        return os.path.join(venv_path, VENV_BIN_DIR, VENV_PIP_EXE)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def get_uv_path() -> Optional[str]:
+        """获取 uv 可执行文件路径
+        
+        Returns:
+            uv 路径，未安装时返回 None（调用方回退到 pip）
+        """
+        return shutil.which("uv")
+
+    @staticmethod
+    def create_venv(venv_path: str) -> None:
+        """创建虚拟环境
+        
+        POSIX 平台上从模板虚拟环境（每个 Python 版本只创建一次）复制得到，
+        复制后改写脚本中写死的模板路径；Windows 的启动器 exe 内嵌路径无法改写，直接创建。
+        
+        Args:
+            venv_path: 虚拟环境路径
+        """
+        if os.name == "nt":
+            EnvManager._build_venv(venv_path)
+            return
+        template = EnvManager._ensure_template_venv()
+        EnvManager._clone_venv(template, venv_path)
+
+    @staticmethod
+    def _build_venv(venv_path: str) -> None:
+        """直接创建虚拟环境
+        
+        已安装 virtualenv 时使用其 app-data 种子器，pip/setuptools/wheel 从本机共享的
+        wheel 缓存链接进新环境，不再逐个环境引导安装；未安装时回退到标准库 venv。
+        创建后升级一次 pip，由模板克隆的项目环境无需再各自升级。
+        """
+        try:
+            import virtualenv
+        except ImportError:
+            import venv
+            venv.create(venv_path, with_pip=True)
+        else:
+            virtualenv.cli_run([venv_path, "--seeder", "app-data", "--no-periodic-update", "--symlinks"])
+        python_path = os.path.join(venv_path, VENV_BIN_DIR, VENV_PYTHON_EXE)
+        result = subprocess.run(
+            [python_path, "-m", "pip", "install", *PIP_INSTALL_FLAGS, "--upgrade", "pip"],
+            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+        )
+        if result.returncode != 0:
+            logger.warning(f"Pip升级失败 (忽略): {result.stdout[-2000:]}")
+
+    @staticmethod
+    def _ensure_template_venv() -> str:
+        """确保当前 Python 版本的模板虚拟环境存在并返回其路径
+        
+        模板先在临时目录中创建，完成后原子重命名到位；并发创建时只保留先完成的一个。
+        """
+        template = os.path.join(VENVS_DIR, "_template", f"py{sys.version_info.major}.{sys.version_info.minor}")
+        if os.path.exists(template):
+            return template
+        building = f"{template}.{os.getpid()}.tmp"
+        logger.info(f"Creating template virtual environment at {template}")
+        EnvManager._build_venv(building)
+        # 模板中的脚本按最终路径改写，与克隆后的改写方式一致
+        EnvManager._relocate_venv(building, template)
+        try:
+            os.rename(building, template)
+        except OSError:
+            # 其他进程已先完成模板
+            shutil.rmtree(building, ignore_errors=True)
+        return template
+
+    @staticmethod
+    def _clone_venv(template: str, venv_path: str) -> None:
+        """复制模板虚拟环境并改写其中的路径
+        
+        Linux 上使用 cp --reflink=auto，支持写时复制的文件系统上不复制数据；
+        其他平台或 cp 失败时使用 shutil.copytree（保留符号链接）。
+        """
+        os.makedirs(os.path.dirname(venv_path), exist_ok=True)
+        copied = False
+        if sys.platform.startswith("linux"):
+            copied = subprocess.run(
+                ["cp", "-a", "--reflink=auto", template, venv_path],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            ).returncode == 0
+            if not copied:
+                shutil.rmtree(venv_path, ignore_errors=True)
+        if not copied:
+            shutil.copytree(template, venv_path, symlinks=True)
+        EnvManager._relocate_venv(venv_path, venv_path, template)
+
+    @staticmethod
+    def _relocate_venv(venv_path: str, target: str, source: Optional[str] = None) -> None:
+        """将虚拟环境 bin 目录脚本和 pyvenv.cfg 中的旧路径替换为 target
+        
+        Args:
+            venv_path: 要改写的虚拟环境目录
+            target: 替换后的路径
+            source: 被替换的路径，默认为 venv_path
+        """
+        old = os.fsencode(source or venv_path)
+        new = os.fsencode(target)
+        if old == new:
+            return
+        bin_dir = os.path.join(venv_path, VENV_BIN_DIR)
+        with os.scandir(bin_dir) as entries:
+            paths = [entry.path for entry in entries if entry.is_file(follow_symlinks=False)]
+        paths.append(os.path.join(venv_path, "pyvenv.cfg"))
+        for path in paths:
+            with open(path, "rb") as f:
+                content = f.read()
+            if old in content:
+                with open(path, "wb") as f:
+                    f.write(content.replace(old, new))
 
     @staticmethod
     def get_project_requirements_path(project_name: str) -> str:
@@ -198,6 +417,15 @@ class EnvManager:
         """
         return os.path.join(PROJECTS_DIR, project_name, "requirements.txt")
 
+    @staticmethod
+    def get_system_requirements() -> Tuple[str, ...]:
+        """获取系统级依赖行（按文件修改时间缓存）
+        
+        Returns:
+            Tuple[str, ...]: 系统级依赖行
+        """
+        return read_requirements(SYSTEM_REQUIREMENTS_PATH)
+
     @staticmethod
     def get_system_requirements_path() -> str:
         """获取系统级依赖文件路径
@@ -205,4 +433,7 @@ class EnvManager:
         Returns:
             系统级依赖文件路径
         """
-        return SYSTEM_REQUIREMENTS_PATH 
\ No newline at end of file
+        return SYSTEM_REQUIREMENTS_PATH
+
+# 全局环境变量管理器实例
+env_manager = EnvManager()
@@ -3,20 +3,36 @@ import importlib.util
 import sys
 import asyncio
 import time
+import heapq
+import itertools
 from typing import Any, Dict, Optional
 import logging
-from dotenv import load_dotenv
 from datetime import datetime
 import json
 from multiprocessing import Lock, Manager
-from cloudfunction.core.env import EnvManager, VENVS_DIR
-from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from cloudfunction.core.env import EnvManager, PROJECTS_DIR, VENVS_DIR, env_manager
 from cloudfunction.utils.logger import get_logger
 import shutil
 import subprocess
 
 logger = get_logger(__name__)
 
+# 函数执行记录保留时长（秒）
+FUNCTION_RECORD_TTL = 3600
+
+
+# 本进程内已确认存在虚拟环境的项目
+_ensured_venvs = set()
+
+def forget_venv(project_name: str) -> None:
+    """项目虚拟环境被删除或重建后调用，下次使用时重新检查并创建
+    
+    Args:
+        project_name: 项目名称
+    """
+    _ensured_venvs.discard(project_name)
+
 class FunctionExecutor:
     """函数执行器"""
     
@@ -30,11 +46,19 @@ class FunctionExecutor:
         """
         logger.info(f"初始化函数执行器: project={project_name}")
         self.project_name = project_name
-        self.env_manager = EnvManager()
-        self.env_manager.get_project_env(project_name)
-        logger.debug(f"已加载项目环境变量: {self.env_manager.get_project_env(project_name)}")
-        self.executor = ThreadPoolExecutor(max_workers=10)
+        # 项目目录与依赖文件路径，只计算一次
+        self._proj_dir = Path(PROJECTS_DIR) / project_name
+        self._req_path = self._proj_dir / "requirements.txt"
+        self.env_manager = env_manager
+        self.env = self.env_manager.get_project_env(project_name)
+        logger.debug("已加载项目环境变量: %s", self.env)
         self.running_functions = {}
+        # 执行记录ID生成器，执行器内自增唯一
+        self._next_id = itertools.count().__next__
+        # 过期时间最小堆: (monotonic 过期时间, func_id)
+        self._expiry_heap = []
+        # 函数列表缓存: (目录 mtime, 函数名元组)
+        self._functions_cache = None
         self.semaphore = asyncio.Semaphore(10)  # 限制并发执行数量
         self.registry = registry
         self.state = state
@@ -51,38 +75,52 @@ class FunctionExecutor:
 
     def _get_venv_python(self) -> str:
         """获取项目虚拟环境的Python解释器路径"""
-        if os.name == 'nt':  # Windows
-            return os.path.join(self._get_venv_path(), "Scripts", "python.exe")
-        return os.path.join(self._get_venv_path(), "bin", "python")
+        return EnvManager.get_venv_python(self.project_name)
 
     def _get_venv_pip(self) -> str:
         """获取项目虚拟环境的pip路径"""
-        if os.name == 'nt':  # Windows
-            return os.path.join(self._get_venv_path(), "Scripts", "pip.exe")
-        return os.path.join(self._get_venv_path(), "bin", "pip")
+        return EnvManager.get_venv_pip(self.project_name)
 
     def _ensure_venv(self):
-        """确保项目虚拟环境存在"""
+        """确保项目虚拟环境存在（每个项目在本进程内只检查一次）"""
+        if self.project_name in _ensured_venvs:
+            return
         venv_path = self._get_venv_path()
         if not os.path.exists(venv_path):
             logger.info(f"为项目 {self.project_name} 创建虚拟环境")
-            import venv
-            venv.create(venv_path, with_pip=True)
+            EnvManager.create_venv(venv_path)
+        _ensured_venvs.add(self.project_name)
+
+    def _install_requirements(self) -> bool:
+        """安装项目依赖
+        
+        与项目进程启动时使用同一安装函数和依赖哈希文件，合并后的依赖与上次成功安装时
+        一致则跳过；部署后启动项目不会再次安装相同依赖。
+        
+        Returns:
+            是否成功（失败时抛出 RuntimeError）
+        """
+        # 虚拟环境可能已在本进程之外被删除，安装前重新确认（部署路径，不在函数调用热路径上）
+        if not os.path.isdir(self._get_venv_path()):
+            forget_venv(self.project_name)
+            self._ensure_venv()
+        # 延迟导入，避免循环依赖
+        from .project import install_requirements
+        return install_requirements(self.project_name)
 
     async def _cleanup_task(self):
-        """定期清理过期的函数记录"""
+        """按过期堆清理过期的函数记录，休眠到最早一条记录过期为止"""
         while True:
             try:
-                current_time = time.time()
-                expired = []
-                for func_id, info in self.running_functions.items():
-                    if current_time - info['start_time'] > 3600:  # 1小时后清理
-                        expired.append(func_id)
+                now = time.monotonic()
+                heap = self._expiry_heap
+                while heap and heap[0][0] <= now:
+                    _, func_id = heapq.heappop(heap)
+                    self.running_functions.pop(func_id, None)
                 
-                for func_id in expired:
-                    del self.running_functions[func_id]
-                
-                await asyncio.sleep(300)  # 每5分钟清理一次
+                # 新记录的过期时间不会早于 now + TTL，堆为空时休眠一个 TTL 即可
+                delay = heap[0][0] - now if heap else FUNCTION_RECORD_TTL
+                await asyncio.sleep(delay)
             except Exception as e:
                 logger.error(f"Error in cleanup task: {str(e)}")
                 await asyncio.sleep(60)
@@ -97,7 +135,7 @@ class FunctionExecutor:
         Returns:
             函数执行结果
         """
-        func_id = f"{self.project_name}:{function_name}:{time.time()}"
+        func_id = self._next_id()
         
         try:
             # 使用信号量限制并发
@@ -108,6 +146,7 @@ class FunctionExecutor:
                     'status': 'running',
                     'function': function_name
                 }
+                heapq.heappush(self._expiry_heap, (time.monotonic() + FUNCTION_RECORD_TTL, func_id))
                 
                 logger.info(f"执行函数: {self.project_name}/{function_name}")
                 
@@ -148,7 +187,7 @@ class FunctionExecutor:
                 "error": str(e)
             }
 
-    def get_function_status(self, func_id: str) -> Optional[Dict[str, Any]]:
+    def get_function_status(self, func_id: int) -> Optional[Dict[str, Any]]:
         """获取函数执行状态
         
         Args:
@@ -167,6 +206,26 @@ class FunctionExecutor:
         """
         return self.running_functions 
 
+    @staticmethod
+    def _validate_code(code: bytes) -> None:
+        """验证函数代码能通过编译且包含main函数
+        
+        Args:
+            code: 函数代码
+            
+        Raises:
+            ValueError: 代码格式无效或缺少main函数
+        """
+        try:
+            code_str = code.decode('utf-8')
+            compile(code_str, '<string>', 'exec')  # 基本语法检查
+        except (UnicodeDecodeError, SyntaxError) as e:
+            raise ValueError(f"函数代码格式无效: {str(e)}")
+        
+        # 简单检查是否包含main函数定义
+        if "def main(" not in code_str and "async def main(" not in code_str:
+            raise ValueError("函数代码必须包含main函数")
+
     async def deploy_function(
         self,
         function_name: str,
@@ -180,53 +239,55 @@ class FunctionExecutor:
             if not code or len(code.strip()) == 0:
                 raise ValueError("函数代码不能为空")
             
-            # 验证代码格式和main函数
-            try:
-                code_str = code.decode('utf-8')
-                compile(code_str, '<string>', 'exec')  # 基本语法检查
-                
-                # 简单检查是否包含main函数定义
-                if "def main(" not in code_str and "async def main(" not in code_str:
-                    raise ValueError("函数代码必须包含main函数")
-            except (UnicodeDecodeError, SyntaxError) as e:
-                raise ValueError(f"函数代码格式无效: {str(e)}")
+            # 验证代码格式和main函数（编译较慢，放到线程中执行，避免阻塞事件循环）
+            await asyncio.to_thread(self._validate_code, code)
             
-            # 备份现有文件
-            code_path = f"cloudfunction/projects/{self.project_name}/{function_name}.py"
-            backup_path = f"{code_path}.bak"
-            if os.path.exists(code_path):
-                logger.debug(f"备份现有文件: {code_path} -> {backup_path}")
-                shutil.copy2(code_path, backup_path)
+            # 一次扫描项目目录，代替逐个 os.path.exists
+            entries = {entry.name for entry in os.scandir(self._proj_dir)}
             
-            # 保存代码文件
-            logger.debug(f"保存代码文件: {code_path}")
-            with open(code_path, "wb") as f:
+            # 先完整写入临时文件，避免并发读取到写了一半的代码
+            code_path = self._proj_dir / f"{function_name}.py"
+            backup_path = self._proj_dir / f"{function_name}.py.bak"
+            tmp_path = self._proj_dir / f"{function_name}.py.tmp"
+            logger.debug(f"写入临时代码文件: {tmp_path}")
+            with open(tmp_path, "wb") as f:
                 f.write(code)
             
-            # 处理项目依赖
-            project_req_path = f"cloudfunction/projects/{self.project_name}/requirements.txt"
-            if requirements:
-                # 如果提供了新的依赖，更新项目级别的requirements.txt
-                logger.debug(f"更新项目依赖文件: {project_req_path}")
-                with open(project_req_path, "wb") as f:
-                    f.write(requirements)
+            # 备份现有文件（原子重命名，无需复制）
+            has_backup = f"{function_name}.py" in entries
+            if has_backup:
+                logger.debug(f"备份现有文件: {code_path} -> {backup_path}")
+                os.replace(code_path, backup_path)
             
-            # 安装项目依赖
-            if os.path.exists(project_req_path):
-                try:
-                    pip_path = self._get_venv_pip()
-                    logger.debug(f"安装项目依赖: {project_req_path}")
-                    subprocess.run([pip_path, "install", "-r", project_req_path], check=True)
-                except Exception as e:
-                    logger.error(f"安装项目依赖失败: {str(e)}")
-                    # 如果安装失败，恢复备份
-                    if os.path.exists(backup_path):
-                        logger.debug(f"恢复备份文件: {backup_path} -> {code_path}")
-                        shutil.copy2(backup_path, code_path)
-                    raise ValueError(f"安装项目依赖失败: {str(e)}")
+            try:
+                # 保存代码文件（原子替换）
+                logger.debug(f"保存代码文件: {code_path}")
+                os.replace(tmp_path, code_path)
+                
+                # 处理项目依赖
+                project_req_path = self._req_path
+                if requirements:
+                    # 如果提供了新的依赖，更新项目级别的requirements.txt
+                    logger.debug(f"更新项目依赖文件: {project_req_path}")
+                    with open(project_req_path, "wb") as f:
+                        f.write(requirements)
+                
+                # 安装项目依赖（依赖文件未变化时跳过）
+                if requirements or "requirements.txt" in entries:
+                    try:
+                        await asyncio.to_thread(self._install_requirements)
+                    except Exception as e:
+                        logger.error(f"安装项目依赖失败: {str(e)}")
+                        raise ValueError(f"安装项目依赖失败: {str(e)}")
+            except Exception:
+                # 部署失败，恢复备份
+                if has_backup:
+                    logger.debug(f"恢复备份文件: {backup_path} -> {code_path}")
+                    os.replace(backup_path, code_path)
+                raise
             
             # 删除备份文件
-            if os.path.exists(backup_path):
+            if has_backup:
                 os.remove(backup_path)
             
             # 更新环境变量
@@ -269,15 +330,21 @@ class FunctionExecutor:
     async def list_functions(self) -> Dict[str, Any]:
         logger.info("获取函数列表")
         try:
-            import os
-            functions_dir = f"cloudfunction/projects/{self.project_name}"
+            functions_dir = self._proj_dir
             logger.debug(f"扫描函数目录: {functions_dir}")
             
-            functions = []
-            for file in os.listdir(functions_dir):
-                if file.endswith(".py") and not file.endswith("_requirements.txt"):
-                    function_name = file[:-3]
-                    functions.append(function_name)
+            # 目录修改时间未变时直接使用缓存的函数列表
+            mtime = os.stat(functions_dir).st_mtime_ns
+            cached = self._functions_cache
+            if cached is not None and cached[0] == mtime:
+                functions = list(cached[1])
+            else:
+                with os.scandir(functions_dir) as entries:
+                    functions = [
+                        entry.name[:-3] for entry in entries
+                        if entry.name.endswith(".py")
+                    ]
+                self._functions_cache = (mtime, tuple(functions))
             
             logger.info(f"找到 {len(functions)} 个函数")
             return {
@@ -292,16 +359,14 @@ class FunctionExecutor:
     async def delete_function(self, function_name: str) -> Dict[str, Any]:
         logger.info(f"开始删除函数: {function_name}")
         try:
-            import os
-            
             # 删除代码文件
-            code_path = f"cloudfunction/projects/{self.project_name}/{function_name}.py"
+            code_path = self._proj_dir / f"{function_name}.py"
             logger.debug(f"删除代码文件: {code_path}")
             if os.path.exists(code_path):
                 os.remove(code_path)
             
             # 删除依赖文件
-            req_path = f"cloudfunction/projects/{self.project_name}/{function_name}_requirements.txt"
+            req_path = self._proj_dir / f"{function_name}_requirements.txt"
             logger.debug(f"删除依赖文件: {req_path}")
             if os.path.exists(req_path):
                 os.remove(req_path)
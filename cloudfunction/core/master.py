@@ -5,12 +5,16 @@ from multiprocessing import Process, Queue, Event
 from typing import Dict, Any, Optional
 import signal
 import sys
+import threading
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from queue import Empty
+from .channel import wrap_large_buffers
 
 # 基础配置
-from cloudfunction.config.server import HOST, PORT
-from cloudfunction.utils.logger import get_logger
+from cloudfunction.config.server import HOST, PORT, MAX_INFLIGHT
+from cloudfunction.utils.logger import get_logger, redirect_to_log_queue, start_log_listener, stop_log_listener
 
 # 设置日志
 logger = get_logger(__name__)
@@ -20,7 +24,18 @@ class Master:
     
     def __init__(self, config_file: str = None):
         """初始化主进程管理器"""
+        # 系统级 .env 写入主进程环境，项目进程 fork 时继承
+        from .env import env_manager
+        env_manager.apply_system_env()
         self._init_components()
+        # 等待响应的请求: {project_name: {req_id: Future}}
+        self._pending_requests: Dict[str, Dict[str, asyncio.Future]] = {}
+        # 响应读取线程: {project_name: (响应队列, 线程)}
+        self._response_readers: Dict[str, tuple] = {}
+        # 项目进程可能在多个线程中并行启动，串行化对 state 中进程/队列表的修改
+        self._spawn_lock = threading.Lock()
+        # 请求消息的序列化和写队列在单独线程中进行，单线程保证发送顺序
+        self._ipc_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ipc-out')
         self._startup_status = {
             'api_server': False,
             'projects': {},
@@ -46,12 +61,21 @@ class Master:
         
     def _start_project_process(self, project_name: str):
         """启动项目进程"""
-        self.state.start_project_process(project_name, self._run_project_process)
+        with self._spawn_lock:
+            self.state.start_project_process(project_name, self._run_project_process)
 
-    def _run_project_process(self, project_name: str, queue: Queue, event: Event):
-        """运行项目进程"""
+    def _run_project_process(self, project_name: str, queue: Queue, event: Event, out_queue: Queue):
+        """运行项目进程
+
+        Args:
+            project_name: 项目名称
+            queue: 请求队列，接收主进程发来的消息
+            event: 就绪事件
+            out_queue: 响应队列，执行结果写回主进程
+        """
         try:
-            # 设置项目进程日志
+            # 设置项目进程日志：日志记录交给主进程写出
+            redirect_to_log_queue()
             pid = os.getpid()
             logger.info(f"项目进程启动: {project_name} [PID={pid}]")
             
@@ -66,7 +90,7 @@ class Master:
                 logger.info(f"项目实例创建成功: {project_name}")
             except Exception as e:
                 logger.error(f"项目实例创建失败: {project_name} - {str(e)}", exc_info=True)
-                queue.put({"status": "error", "error": f"Failed to initialize project: {str(e)}"})
+                out_queue.put({"status": "error", "error": f"Failed to initialize project: {str(e)}"})
                 event.set()  # 设置事件，表示进程已准备好(虽然失败)
                 return
             
@@ -81,37 +105,7 @@ class Master:
             # 处理消息循环
             logger.info(f"开始项目消息循环: {project_name}")
             try:
-                while True:
-                    try:
-                        if not queue.empty():
-                            message = queue.get()
-                            logger.info(f"收到消息: {project_name} - {message}")
-                            
-                            if message == "stop":
-                                logger.info(f"收到停止信号，正在停止项目 {project_name}")
-                                # 发送 SIGTERM 信号
-                                os.kill(os.getpid(), signal.SIGTERM)
-                                break
-                            elif isinstance(message, dict):
-                                if message.get("type") == "execute":
-                                    function_name = message.get("function_name")
-                                    payload = message.get("payload")
-                                    logger.info(f"开始执行函数: {project_name}/{function_name}, 参数: {payload}")
-                                    try:
-                                        start_time = time.time()
-                                        # 在现有事件循环中执行函数
-                                        result = loop.run_until_complete(
-                                            project.execute_function_async(function_name, payload)
-                                        )
-                                        elapsed_time = time.time() - start_time
-                                        logger.info(f"函数执行完成: {project_name}/{function_name}, 耗时: {elapsed_time:.2f}秒")
-                                        queue.put({"status": "success", "result": result})
-                                    except Exception as e:
-                                        logger.error(f"函数执行失败: {project_name}/{function_name} - {str(e)}", exc_info=True)
-                                        queue.put({"status": "error", "error": str(e)})
-                    except Exception as e:
-                        logger.error(f"消息处理异常: {project_name} - {str(e)}", exc_info=True)
-                        # 继续处理下一条消息
+                loop.run_until_complete(self._serve_project(project_name, project, queue, out_queue))
             finally:
                 # 清理事件循环
                 try:
@@ -123,7 +117,148 @@ class Master:
         except Exception as e:
             logger.error(f"项目进程异常: {project_name} - {str(e)}", exc_info=True)
             event.set()  # 确保事件被设置，即使发生错误
-            queue.put({"status": "error", "error": str(e)})
+            out_queue.put({"status": "error", "error": str(e)})
+
+    async def _serve_project(self, project_name: str, project, queue, out_queue):
+        """项目进程的消息循环
+
+        请求队列的读端注册到事件循环，有数据可读时在回调中取出全部已到达的消息，
+        不占用额外线程。每个 execute 请求作为独立任务执行，结果按 req_id 写回，
+        同时执行的请求数不超过 MAX_INFLIGHT。
+
+        Args:
+            project_name: 项目名称
+            project: 项目实例
+            queue: 请求队列
+            out_queue: 响应队列
+        """
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+        inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        tasks = set()
+        
+        def _on_done(task):
+            tasks.discard(task)
+            inflight.release()
+        
+        def _on_readable():
+            while True:
+                try:
+                    messages.put_nowait(queue.get(block=False))
+                except Empty:
+                    return
+                except Exception as e:
+                    logger.error(f"读取消息失败: {project_name} - {str(e)}", exc_info=True)
+        
+        fd = queue.fileno()
+        try:
+            loop.add_reader(fd, _on_readable)
+        except NotImplementedError:
+            # 事件循环不支持 add_reader（如 Windows），在线程中阻塞读取
+            fd = None
+        try:
+            while True:
+                try:
+                    if fd is not None:
+                        message = await messages.get()
+                    else:
+                        message = await loop.run_in_executor(None, queue.get)
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info("收到消息: %s - %r", project_name, message)
+                    
+                    if message == "stop":
+                        logger.info(f"收到停止信号，正在停止项目 {project_name}")
+                        # 发送 SIGTERM 信号
+                        os.kill(os.getpid(), signal.SIGTERM)
+                        return
+                    elif isinstance(message, dict):
+                        if message.get("type") == "execute":
+                            await inflight.acquire()
+                            task = loop.create_task(self._execute_message(project_name, project, message, out_queue))
+                            tasks.add(task)
+                            task.add_done_callback(_on_done)
+                except Exception as e:
+                    logger.error(f"消息处理异常: {project_name} - {str(e)}", exc_info=True)
+                    # 继续处理下一条消息
+        finally:
+            if fd is not None:
+                loop.remove_reader(fd)
+            for task in tasks:
+                task.cancel()
+
+    async def _execute_message(self, project_name: str, project, message: Dict[str, Any], out_queue):
+        """执行一条 execute 消息，并将结果按 req_id 写回响应队列"""
+        req_id = message.get("req_id")
+        function_name = message.get("function_name")
+        payload = message.get("payload")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("开始执行函数: %s/%s, 参数: %r", project_name, function_name, payload)
+        try:
+            timed = logger.isEnabledFor(logging.INFO)
+            start_time = time.perf_counter() if timed else 0.0
+            result = await project.execute_function_async(function_name, payload)
+            if timed:
+                logger.info("函数执行完成: %s/%s, 耗时: %.3f秒", project_name, function_name,
+                            time.perf_counter() - start_time)
+            out_queue.put({"req_id": req_id, "status": "success", "result": wrap_large_buffers(result)})
+        except Exception as e:
+            logger.error(f"函数执行失败: {project_name}/{function_name} - {str(e)}", exc_info=True)
+            out_queue.put({"req_id": req_id, "status": "error", "error": str(e)})
+
+    def _ensure_response_reader(self, project_name: str):
+        """确保项目响应队列有读取线程在运行
+
+        项目重启后响应队列会被替换，此时为新队列启动新的读取线程。
+        """
+        out_queue = self.state.get_out_queue(project_name)
+        if out_queue is None:
+            raise ValueError(f"Response queue not found for project {project_name}")
+        reader = self._response_readers.get(project_name)
+        if reader is not None and reader[0] is out_queue and reader[1].is_alive():
+            return
+        thread = threading.Thread(
+            target=self._read_responses,
+            args=(project_name, out_queue, asyncio.get_running_loop()),
+            name=f"responses-{project_name}",
+            daemon=True
+        )
+        thread.start()
+        self._response_readers[project_name] = (out_queue, thread)
+
+    def _read_responses(self, project_name: str, out_queue: Queue, loop: asyncio.AbstractEventLoop):
+        """读取线程：阻塞读取项目响应，交给事件循环分发，收到 None 时退出"""
+        while True:
+            try:
+                response = out_queue.get()
+            except Exception:
+                # 队列已关闭（如进程退出时）
+                break
+            if response is None:
+                break
+            try:
+                loop.call_soon_threadsafe(self._dispatch_response, project_name, response)
+            except RuntimeError:
+                # 事件循环已关闭
+                break
+        logger.debug(f"项目 {project_name} 的响应读取线程退出")
+
+    def _dispatch_response(self, project_name: str, response: Any):
+        """按 req_id 将响应交给对应的等待者（在事件循环中执行）"""
+        pending = self._pending_requests.get(project_name)
+        if not pending:
+            logger.warning(f"收到项目 {project_name} 的响应，但没有等待中的请求: {response}")
+            return
+        req_id = response.get("req_id") if isinstance(response, dict) else None
+        if req_id is None:
+            # 进程级错误没有对应的请求，通知该项目所有等待中的请求
+            for future in pending.values():
+                if not future.done():
+                    future.set_result(response)
+            pending.clear()
+            return
+        future = pending.pop(req_id, None)
+        if future is not None and not future.done():
+            future.set_result(response)
 
     def _stop_project_process(self, project_name: str):
         """停止项目进程"""
@@ -155,6 +290,22 @@ class Master:
         logger.error(f"等待组件 {component_name} 就绪超时")
         return False
 
+    async def _wait_until_ready(self, project_name: str):
+        """等待项目进程就绪（无超时限制）
+        
+        就绪事件已设置时直接返回；否则等待就绪信号，子进程 set 或退出时立即唤醒。
+        
+        Args:
+            project_name: 项目名称
+            
+        Raises:
+            Exception: 等待期间项目进程退出
+        """
+        if self.state.is_process_ready(project_name):
+            return
+        self.state._log_operation('info', project_name, 'execute', '等待进程就绪')
+        await self.state.wait_until_ready(project_name)
+
     async def _check_api_server(self) -> bool:
         """检查API服务器状态"""
         try:
@@ -171,24 +322,49 @@ class Master:
     async def _check_project_process(self, project_name: str) -> bool:
         """检查项目进程是否就绪"""
         try:
-            if project_name not in self.state._processes:
-                return False
-            if not self.state._processes[project_name].is_alive():
-                return False
-                
-            # 检查事件是否已设置
-            event = self.state.get_event(project_name)
-            if not event or not event.is_set():
-                return False
-                
-            return True
+            return self.state.check_process_status(project_name)
         except Exception as e:
             logger.error(f"检查项目进程状态失败: {str(e)}", exc_info=True)
             return False
 
+    async def _start_and_wait_project(self, project_name: str) -> bool:
+        """启动项目进程并等待就绪
+        
+        进程在线程中启动，多个项目的 fork 和就绪等待可以并行进行。
+        
+        Args:
+            project_name: 项目名称
+            
+        Returns:
+            bool: 项目是否启动并就绪
+        """
+        logger.info(f"正在启动项目: {project_name}")
+        try:
+            await asyncio.to_thread(self._start_project_process, project_name)
+            # 等待项目进程就绪（就绪信号可读时唤醒，不轮询）
+            try:
+                await asyncio.wait_for(self.state.wait_until_ready(project_name), timeout=30)
+                ready = self.state.check_process_status(project_name)
+            except asyncio.TimeoutError:
+                logger.error(f"等待项目 {project_name} 就绪超时")
+                ready = False
+            if ready:
+                logger.info(f"项目 {project_name} 已启动并就绪")
+            else:
+                logger.warning(f"项目 {project_name} 启动超时，未就绪")
+        except Exception as e:
+            logger.error(f"启动项目 {project_name} 失败: {str(e)}", exc_info=True)
+            ready = False
+        self._startup_status['projects'][project_name] = ready
+        return ready
+
     async def start(self):
         """启动主进程"""
         logger.info("开始启动主进程")
+        # 项目进程的退出由事件循环监听，存活检查不再调用 waitpid
+        self.state.set_event_loop(asyncio.get_running_loop())
+        # 项目进程的日志经队列交回主进程统一写出
+        start_log_listener()
         
         try:
             # 1. 初始化基础组件
@@ -198,7 +374,7 @@ class Master:
             # 2. 启动 API 服务器
             logger.info("2. 启动 API 服务器")
             from .server import APIServer
-            from .env import PROJECTS_DIR
+            from .env import EnvManager, PROJECTS_DIR
             
             api_server = self.state.get_api_server()
             if not api_server:
@@ -209,32 +385,27 @@ class Master:
                 self._startup_status['api_server'] = True
                 logger.info(f"API 服务器已启动并监听 {HOST}:{PORT}")
             
-            # 3. 启动项目进程并等待就绪
+            # 3. 并行启动项目进程并等待就绪
             logger.info("3. 启动项目进程")
+            # 预先读取系统级依赖，fork 出的项目进程直接继承解析结果
+            EnvManager.get_system_requirements()
+            with os.scandir(PROJECTS_DIR) as entries:
+                project_names = [
+                    entry.name for entry in entries
+                    if entry.is_dir() and not entry.name.startswith("__")
+                ]
+            results = await asyncio.gather(
+                *(self._start_and_wait_project(project_name) for project_name in project_names),
+                return_exceptions=True
+            )
             failed_projects = []
-            for project_name in os.listdir(PROJECTS_DIR):
-                project_path = os.path.join(PROJECTS_DIR, project_name)
-                if os.path.isdir(project_path) and not project_name.startswith("__"):
-                    logger.info(f"正在启动项目: {project_name}")
-                    try:
-                        self._start_project_process(project_name)
-                        # 等待项目进程就绪（事件 set）
-                        ready = await self._wait_for_component(
-                            f"项目 {project_name}",
-                            lambda: self.state.check_process_status(project_name),
-                            timeout=30
-                        )
-                        if ready:
-                            self._startup_status['projects'][project_name] = True
-                            logger.info(f"项目 {project_name} 已启动并就绪")
-                        else:
-                            self._startup_status['projects'][project_name] = False
-                            failed_projects.append(project_name)
-                            logger.warning(f"项目 {project_name} 启动超时，未就绪")
-                    except Exception as e:
-                        logger.error(f"启动项目 {project_name} 失败: {str(e)}", exc_info=True)
-                        self._startup_status['projects'][project_name] = False
-                        failed_projects.append(project_name)
+            for project_name, ready in zip(project_names, results):
+                if isinstance(ready, BaseException):
+                    logger.error(f"启动项目 {project_name} 失败: {str(ready)}")
+                    self._startup_status['projects'][project_name] = False
+                    ready = False
+                if not ready:
+                    failed_projects.append(project_name)
             # 启动检查结束后统一输出 warning
             if failed_projects:
                 logger.warning(f"以下项目启动失败: {', '.join(failed_projects)}")
@@ -273,6 +444,12 @@ class Master:
             except Exception as e:
                 logger.error(f"清理状态管理器资源时出错: {str(e)}", exc_info=True)
             
+            # 4. 关闭IPC发送线程
+            self._ipc_executor.shutdown(wait=False)
+            
+            # 5. 停止日志监听，写出项目进程剩余的日志
+            stop_log_listener()
+            
             logger.info("主进程停止完成")
             
         except Exception as e:
@@ -301,8 +478,8 @@ class Master:
                     self.state._handle_error(project_name, 'start_project', e)
                     raise ValueError(f"Project {project_name} is not running and could not be started")
                     
-            # 检查进程是否活跃
-            if not self.state.check_process_status(project_name):
+            # 检查进程是否活跃（尚未就绪的进程由下面的就绪等待处理，不重启）
+            if not self.state.is_process_alive(project_name):
                 self.state._log_operation('warning', project_name, 'execute', '进程已退出，尝试重启')
                 try:
                     # 清理旧进程
@@ -315,48 +492,60 @@ class Master:
                     raise ValueError(f"Project {project_name} process died and could not be restarted")
             
             # 等待项目进程准备好（无超时限制）
-            self.state._log_operation('info', project_name, 'execute', '等待进程就绪')
-            while not self.state.check_process_status(project_name):
-                await asyncio.sleep(1)
+            await self._wait_until_ready(project_name)
             
             # 获取项目队列
             queue = self.state.get_queue(project_name)
             if not queue:
                 raise ValueError(f"Queue not found for project {project_name}")
+            self._ensure_response_reader(project_name)
+            
+            # 登记等待中的请求，由响应读取线程按 req_id 分发结果
+            req_id = uuid.uuid4().hex
+            future = asyncio.get_running_loop().create_future()
+            pending = self._pending_requests.setdefault(project_name, {})
+            pending[req_id] = future
             
             # 发送执行消息
             message = {
                 "type": "execute",
+                "req_id": req_id,
                 "function_name": function_name,
-                "payload": payload
+                "payload": wrap_large_buffers(payload)
             }
-            logger.info(f"发送执行消息到项目 {project_name}: {message}")
-            queue.put(message)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("发送执行消息到项目 %s: %r", project_name, message)
             
             # 等待结果（无超时限制）
-            logger.info(f"等待项目 {project_name} 返回执行结果...")
-            start_time = time.time()
-            while True:
-                try:
-                    result = queue.get(timeout=1)  # 1秒超时，用于检查任务是否被取消
-                    elapsed_time = time.time() - start_time
-                    logger.info(f"收到项目 {project_name} 的响应，耗时: {elapsed_time:.2f}秒")
-                    
-                    if isinstance(result, dict):
-                        if result.get("status") == "success":
-                            logger.info(f"函数 {function_name} 执行成功")
-                            return result.get("result")
-                        elif result.get("status") == "error":
-                            error_msg = result.get("error")
-                            logger.error(f"函数 {function_name} 执行失败: {error_msg}")
-                            raise Exception(error_msg)
-                    else:
-                        logger.warning(f"收到未知格式的响应: {result}")
-                except Empty:
-                    # 检查进程是否还活着
+            timed = logger.isEnabledFor(logging.INFO)
+            if timed:
+                logger.info("等待项目 %s 返回执行结果...", project_name)
+            start_time = time.perf_counter() if timed else 0.0
+            try:
+                await asyncio.get_running_loop().run_in_executor(self._ipc_executor, queue.put, message)
+                while True:
+                    # 每秒检查一次进程是否还活着
+                    done, _ = await asyncio.wait({future}, timeout=1)
+                    if done:
+                        break
                     if not self.state.check_process_status(project_name):
                         raise Exception(f"Project {project_name} process died during execution")
-                    continue
+            finally:
+                pending.pop(req_id, None)
+            
+            result = future.result()
+            if timed:
+                logger.info("收到项目 %s 的响应，耗时: %.3f秒", project_name, time.perf_counter() - start_time)
+            
+            if isinstance(result, dict):
+                if result.get("status") == "success":
+                    logger.info(f"函数 {function_name} 执行成功")
+                    return result.get("result")
+                elif result.get("status") == "error":
+                    error_msg = result.get("error")
+                    logger.error(f"函数 {function_name} 执行失败: {error_msg}")
+                    raise Exception(error_msg)
+            raise Exception(f"收到未知格式的响应: {result}")
             
         except Exception as e:
             self.state._handle_error(project_name, 'execute_function', e)
@@ -378,4 +567,6 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    from cloudfunction.utils.loop import install_event_loop_policy
+    install_event_loop_policy()
     asyncio.run(main()) 
\ No newline at end of file
@@ -1,25 +1,238 @@
 import os
 import asyncio
+import compileall
+import importlib.machinery
 import importlib.util
 import logging
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Any, Optional
+import mmap
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Any, Optional, List, Tuple
+from collections import deque
+from functools import lru_cache
 import json
+import re
+import hashlib
 import sys
-import venv
+import shutil
 import subprocess
-from .env import EnvManager, PROJECTS_DIR, VENVS_DIR
+from .env import (
+    EnvManager, read_requirements, PIP_INSTALL_FLAGS, PROJECTS_DIR, VENVS_DIR, WHEELHOUSE_DIR, VENV_BIN_DIR, VENV_PIP_EXE, VENV_PYTHON_EXE, env_manager
+)
+from cloudfunction.config.server import PRELOAD_FUNCTIONS
 from cloudfunction.utils.logger import get_logger
 import multiprocessing
-import psutil
-import concurrent.futures
 import time
 import signal
+import threading
 from multiprocessing import Process, Queue, Event
 
 # 设置日志
 logger = get_logger(__name__)
 
+# 进程内共享的同步函数执行线程池（线程按需创建，fork 前不会启动）
+_EXECUTOR = ThreadPoolExecutor(
+    max_workers=min(32, (os.cpu_count() or 1) * 4),
+    thread_name_prefix='cf-fn'
+)
+
+# CPU 密集型函数（模块中声明 EXECUTOR = "process"）使用的进程池，首次使用时创建
+_process_executor: Optional[ProcessPoolExecutor] = None
+
+def _get_process_executor() -> ProcessPoolExecutor:
+    """获取进程内共享的进程池"""
+    global _process_executor
+    if _process_executor is None:
+        _process_executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count() or 1,
+            mp_context=multiprocessing.get_context(
+                "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+            )
+        )
+    return _process_executor
+
+def _reset_process_executor() -> None:
+    """关闭进程池，下次使用时重新 fork，使工作进程加载到重新导入后的模块"""
+    global _process_executor
+    if _process_executor is not None:
+        _process_executor.shutdown(wait=False)
+        _process_executor = None
+
+# PEP 508 包名：后面只能跟 extras、版本约束、环境标记、URL 说明或行尾
+_REQUIREMENT_NAME_RE = re.compile(r"([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?=[\[(<>=!~;@\s]|$)")
+
+@lru_cache(maxsize=4096)
+def _requirement_key(line: str) -> str:
+    """依赖行去重用的键：按 PEP 503 规范化的包名（Foo_Bar 与 foo-bar 相同）
+
+    无法识别包名的行（如 -r、URL）以整行为键。
+    """
+    match = _REQUIREMENT_NAME_RE.match(line)
+    if match is None:
+        return line
+    return re.sub(r"[-_.]+", "-", match.group(1)).lower()
+
+# 已安装依赖集合的 sha256 文件名（位于项目虚拟环境目录下）
+REQUIREMENTS_DIGEST_FILE = ".requirements.sha256"
+
+def install_requirements(project_name: str) -> bool:
+    """安装项目依赖（项目级与系统级合并）到项目虚拟环境
+    
+    合并后的依赖集合与上次成功安装时一致则跳过。项目进程启动和函数部署共用本函数，
+    两条路径使用同一个哈希文件，任一方装过的依赖另一方不再重复安装。
+    
+    Args:
+        project_name: 项目名称
+        
+    Returns:
+        bool: 是否成功（失败时抛出 RuntimeError）
+    """
+    project_dir = os.path.join(PROJECTS_DIR, project_name)
+    venv_dir = EnvManager.get_venv_path(project_name)
+    try:
+        # 获取系统级依赖（EnvManager 按文件修改时间缓存，各项目共用）
+        system_requirements = EnvManager.get_system_requirements()
+
+        # 获取项目级依赖
+        project_requirements_path = EnvManager.get_project_requirements_path(project_name)
+        project_requirements = read_requirements(project_requirements_path)
+        if project_requirements or os.path.exists(project_requirements_path):
+            logger.info(f"项目 {project_name} 依赖项: {project_requirements}")
+        else:
+            logger.warning(f"项目 {project_name} 没有找到依赖文件: {project_requirements_path}")
+
+        # 合并依赖，按包名去重：先放项目级依赖，系统级依赖只补充项目未声明的包
+        merged = {_requirement_key(req): req for req in project_requirements}
+        for req in system_requirements:
+            merged.setdefault(_requirement_key(req), req)
+        all_requirements = list(merged.values())
+
+        if not all_requirements:
+            logger.info(f"No requirements to install for project {project_name}")
+            return True
+
+        # 合并后的依赖与上次成功安装时一致则跳过 pip（排序后计算，调整行顺序不触发重装）。
+        # 哈希文件放在虚拟环境目录中，虚拟环境被删除重建时随之失效
+        digest = hashlib.sha256("\n".join(sorted(all_requirements)).encode()).hexdigest()
+        lock_path = os.path.join(project_dir, "requirements.lock")
+        digest_path = os.path.join(venv_dir, REQUIREMENTS_DIGEST_FILE)
+        if os.path.exists(lock_path):
+            try:
+                with open(digest_path, "r") as f:
+                    if f.read().strip() == digest:
+                        logger.info(f"项目 {project_name} 依赖未变化，跳过安装")
+                        return True
+            except FileNotFoundError:
+                pass
+
+        logger.info(f"准备安装依赖: {all_requirements}")
+
+        # 依赖直接作为命令行参数传给安装器，不再写临时 requirements 文件；
+        # 选项行（如 --index-url URL、-r 文件）拆成选项和值，相对路径相对项目目录解析
+        requirement_args = [
+            arg for req in all_requirements
+            for arg in (req.split(None, 1) if req.startswith("-") else (req,))
+        ]
+
+        # 优先使用 uv 安装到项目虚拟环境，未安装 uv 时使用虚拟环境的 pip
+        uv_path = EnvManager.get_uv_path()
+        if uv_path:
+            python_path = EnvManager.get_venv_python(project_name)
+            logger.info(f"使用uv路径: {uv_path}")
+            # uv 默认不生成 .pyc（pip 默认生成），显式编译，避免项目首次导入依赖时再编译
+            pip_cmd = [uv_path, "pip", "install", "--python", python_path, "--compile-bytecode", *requirement_args]
+            freeze_cmd = [uv_path, "pip", "freeze", "--python", python_path, "--exclude-editable"]
+        else:
+            pip_path = EnvManager.get_venv_pip(project_name)
+            logger.info(f"使用pip路径: {pip_path}")
+            # pip 已在创建虚拟环境时升级；依赖从按哈希共享的 wheel 仓库离线安装
+            wheelhouse_args = _prepare_wheelhouse(pip_path, digest, requirement_args, project_dir)
+            # 只使用 pip 的命令行接口，不依赖 pip 内部模块
+            pip_cmd = [pip_path, "install", *PIP_INSTALL_FLAGS, *wheelhouse_args, *requirement_args]
+            freeze_cmd = [pip_path, "freeze", "--disable-pip-version-check", "--exclude-editable"]
+
+        # 安装依赖
+        logger.info(f"执行安装命令: {' '.join(pip_cmd)}")
+
+        returncode, output = _run_streaming(pip_cmd, cwd=project_dir)
+        if returncode != 0:
+            error_msg = f"依赖安装失败，返回码: {returncode}, 错误: {output}"
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+
+        # 记录安装的依赖版本，输出直接写入锁文件
+        with open(lock_path, "w") as f:
+            subprocess.run(freeze_cmd, stdout=f, stderr=subprocess.PIPE, text=True, check=True)
+        with open(digest_path, "w") as f:
+            f.write(digest)
+
+        logger.info(f"依赖安装成功: {project_name}")
+        return True
+
+    except Exception as e:
+        logger.error(f"依赖安装失败: {str(e)}", exc_info=True)
+        # 将布尔返回值改为抛出异常，确保问题不被忽略
+        raise RuntimeError(f"依赖安装失败: {str(e)}")
+
+def _prepare_wheelhouse(pip_path: str, digest: str, requirement_args: List[str], cwd: str) -> List[str]:
+    """准备依赖集合对应的本地 wheel 仓库
+
+    仓库目录以依赖集合的 sha256 命名，首次缺失时用 pip wheel 下载并构建全部依赖
+    （含传递依赖）的 wheel，之后依赖相同的项目不再访问索引、不再构建源码包。
+
+    Args:
+        pip_path: 虚拟环境 pip 路径
+        digest: 合并后依赖的 sha256
+        requirement_args: 依赖命令行参数
+        cwd: 执行 pip 的工作目录（项目目录），依赖中的相对路径相对它解析
+
+    Returns:
+        List[str]: pip install 的附加参数；仓库构建失败时为空列表，按在线方式安装
+    """
+    wheelhouse = os.path.join(WHEELHOUSE_DIR, digest)
+    if not os.path.isdir(wheelhouse):
+        building = f"{wheelhouse}.{os.getpid()}.tmp"
+        returncode, output = _run_streaming(
+            [pip_path, "wheel", *PIP_INSTALL_FLAGS, "--wheel-dir", building, *requirement_args],
+            cwd=cwd
+        )
+        if returncode != 0:
+            logger.warning(f"构建wheel仓库失败，改为在线安装: {output}")
+            shutil.rmtree(building, ignore_errors=True)
+            return []
+        try:
+            os.rename(building, wheelhouse)
+        except OSError:
+            # 其他进程已先完成同一仓库
+            shutil.rmtree(building, ignore_errors=True)
+    return ["--no-index", "--find-links", wheelhouse]
+
+def _run_streaming(cmd: List[str], tail_lines: int = 20, cwd: Optional[str] = None) -> Tuple[int, str]:
+    """运行命令并逐行读取输出，不在内存中缓存全部输出
+
+    Args:
+        cmd: 命令及参数
+        tail_lines: 保留的最后输出行数，用于错误信息
+        cwd: 工作目录，默认为当前目录
+
+    Returns:
+        Tuple[int, str]: (返回码, 最后若干行输出)
+    """
+    tail = deque(maxlen=tail_lines)
+    with subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1
+    ) as proc:
+        for line in proc.stdout:
+            line = line.rstrip()
+            logger.debug(line)
+            tail.append(line)
+        returncode = proc.wait()
+    return returncode, "\n".join(tail)
+
 class ProjectProcess:
     """项目处理类"""
     
@@ -35,17 +248,21 @@ class ProjectProcess:
         self.queue = queue
         self.event = event
         self.function_registry = {}
-        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
         self.initialized = False
-        self.env_manager = EnvManager()  # 初始化环境管理器
+        self._load_locks: Dict[str, threading.Lock] = {}  # 函数名 -> 导入锁，避免并发首次调用重复导入
+        self.env_manager = env_manager  # 共享的环境管理器
         
         # 设置项目目录
         self.project_dir = os.path.join(PROJECTS_DIR, name)
         if not os.path.exists(self.project_dir):
             raise ValueError(f"Project directory not found: {self.project_dir}")
+        self.package_name = self._resolve_package_name()
             
-        # 设置虚拟环境目录
+        # 设置虚拟环境目录，解释器、pip 和 site-packages 路径在进程内不变，只计算一次
         self.venv_dir = os.path.join(VENVS_DIR, name)
+        self._venv_python = self._get_venv_python()
+        self._venv_pip = self._get_venv_pip()
+        self._venv_site_packages = self._get_venv_site_packages()
         
         try:
             # 1. 先创建虚拟环境
@@ -56,20 +273,10 @@ class ProjectProcess:
                 logger.error(f"项目 {name} 依赖安装失败")
                 raise RuntimeError(f"Failed to install dependencies for project {name}")
                 
-            # 3. 添加虚拟环境路径到sys.path
-            if sys.platform == "win32":
-                venv_site_packages = os.path.join(self.venv_dir, "Lib", "site-packages")
-            else:
-                python_version = f"python{sys.version_info.major}.{sys.version_info.minor}"
-                venv_site_packages = os.path.join(self.venv_dir, "lib", python_version, "site-packages")
-            
-            if os.path.exists(venv_site_packages):
-                if venv_site_packages not in sys.path:
-                    sys.path.insert(0, venv_site_packages)
-                    logger.info(f"已添加虚拟环境路径到sys.path: {venv_site_packages}")
-            else:
-                logger.error(f"虚拟环境site-packages路径不存在: {venv_site_packages}")
-                raise RuntimeError(f"Virtual environment site-packages not found: {venv_site_packages}")
+            # 3. 检查虚拟环境路径（在 _load_functions 中加入 sys.path）
+            if not os.path.isdir(self._venv_site_packages):
+                logger.error(f"虚拟环境site-packages路径不存在: {self._venv_site_packages}")
+                raise RuntimeError(f"Virtual environment site-packages not found: {self._venv_site_packages}")
             
             # 4. 最后加载函数
             self._register_functions()
@@ -85,17 +292,18 @@ class ProjectProcess:
 
     def _get_venv_python(self) -> str:
         """获取项目的虚拟环境 Python 解释器路径"""
-        if sys.platform == "win32":
-            return os.path.join(self.venv_dir, "Scripts", "python.exe")
-        else:
-            return os.path.join(self.venv_dir, "bin", "python")
+        return os.path.join(self.venv_dir, VENV_BIN_DIR, VENV_PYTHON_EXE)
 
     def _get_venv_pip(self) -> str:
         """获取项目的虚拟环境 pip 路径"""
+        return os.path.join(self.venv_dir, VENV_BIN_DIR, VENV_PIP_EXE)
+
+    def _get_venv_site_packages(self) -> str:
+        """获取项目的虚拟环境 site-packages 路径"""
         if sys.platform == "win32":
-            return os.path.join(self.venv_dir, "Scripts", "pip.exe")
-        else:
-            return os.path.join(self.venv_dir, "bin", "pip")
+            return os.path.join(self.venv_dir, "Lib", "site-packages")
+        python_version = f"python{sys.version_info.major}.{sys.version_info.minor}"
+        return os.path.join(self.venv_dir, "lib", python_version, "site-packages")
 
     def _create_venv(self):
         """创建项目虚拟环境"""
@@ -103,7 +311,7 @@ class ProjectProcess:
             # 创建项目级虚拟环境（如果不存在）
             if not os.path.exists(self.venv_dir):
                 logger.info(f"Creating project virtual environment for project {self.name}")
-                venv.create(self.venv_dir, with_pip=True)
+                EnvManager.create_venv(self.venv_dir)
                 logger.info(f"Project virtual environment created at {self.venv_dir}")
             else:
                 logger.info(f"Project virtual environment already exists at {self.venv_dir}")
@@ -114,295 +322,152 @@ class ProjectProcess:
 
     def _install_requirements(self) -> bool:
         """安装项目依赖"""
-        try:
-            # 获取系统级依赖
-            system_requirements_path = self.env_manager.get_system_requirements_path()
-            system_requirements = []
-            if os.path.exists(system_requirements_path):
-                with open(system_requirements_path, "r") as f:
-                    system_requirements = [line.strip() for line in f if line.strip() and not line.startswith("#")]
-            
-            # 获取项目级依赖
-            project_requirements_path = self.env_manager.get_project_requirements_path(self.name)
-            project_requirements = []
-            if os.path.exists(project_requirements_path):
-                with open(project_requirements_path, "r") as f:
-                    project_requirements = [line.strip() for line in f if line.strip() and not line.startswith("#")]
-                
-                logger.info(f"项目 {self.name} 依赖项: {project_requirements}")
-            else:
-                logger.warning(f"项目 {self.name} 没有找到依赖文件: {project_requirements_path}")
-            
-            # 合并依赖，项目级覆盖系统级
-            all_requirements = []
-            project_packages = set()
-            
-            # 先添加项目级依赖
-            for req in project_requirements:
-                package = req.split("==")[0].split(">=")[0].split("<=")[0]
-                project_packages.add(package)
-                all_requirements.append(req)
-            
-            # 添加系统级依赖（排除被项目级覆盖的包）
-            for req in system_requirements:
-                package = req.split("==")[0].split(">=")[0].split("<=")[0]
-                if package not in project_packages:
-                    all_requirements.append(req)
-            
-            if not all_requirements:
-                logger.info(f"No requirements to install for project {self.name}")
-                return True
-            
-            logger.info(f"准备安装依赖: {all_requirements}")
-            
-            # 创建临时requirements文件
-            temp_requirements_path = os.path.join(self.project_dir, "_temp_requirements.txt")
-            with open(temp_requirements_path, "w") as f:
-                f.write("\n".join(all_requirements))
-            
-            try:
-                # 使用项目级虚拟环境的pip安装依赖
-                pip_path = self.env_manager.get_venv_pip(self.name)
-                logger.info(f"使用pip路径: {pip_path}")
-                
-                # 先尝试升级pip
-                upgrade_result = subprocess.run(
-                    [pip_path, "install", "--upgrade", "pip"],
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                if upgrade_result.returncode != 0:
-                    logger.warning(f"Pip升级失败 (忽略): {upgrade_result.stderr}")
-                
-                # 安装依赖
-                pip_cmd = [pip_path, "install", "-r", temp_requirements_path]
-                logger.info(f"执行安装命令: {' '.join(pip_cmd)}")
-                
-                result = subprocess.run(
-                    pip_cmd,
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
-                
-                if result.returncode != 0:
-                    error_msg = f"依赖安装失败，返回码: {result.returncode}, 错误: {result.stderr}"
-                    logger.error(error_msg)
-                    raise RuntimeError(error_msg)
-                
-                # 记录安装的依赖版本
-                freeze_result = subprocess.run(
-                    [pip_path, "freeze"],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                
-                # 保存依赖版本到文件
-                with open(os.path.join(self.project_dir, "requirements.lock"), "w") as f:
-                    f.write(freeze_result.stdout)
-                
-                logger.info(f"依赖安装成功: {self.name}")
-                return True
-                
-            finally:
-                # 删除临时文件
-                if os.path.exists(temp_requirements_path):
-                    os.remove(temp_requirements_path)
-            
-        except Exception as e:
-            logger.error(f"依赖安装失败: {str(e)}", exc_info=True)
-            # 将布尔返回值改为抛出异常，确保问题不被忽略
-            raise RuntimeError(f"依赖安装失败: {str(e)}")
+        return install_requirements(self.name)
 
     def _register_functions(self):
         """注册项目函数（不导入）"""
         # 扫描项目目录中的Python文件
         functions_registered = 0
         logger.info(f"扫描项目 {self.name} 中的函数文件...")
-        for file in os.listdir(self.project_dir):
-            if file.endswith('.py') and not file.startswith('_'):
-                function_name = file[:-3]
-                logger.info(f"尝试注册函数: {function_name}")
-                try:
-                    # 读取文件内容
-                    file_path = os.path.join(self.project_dir, file)
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        
-                    # 检查是否有main函数
-                    if 'def main(' in content:
-                        # 检查是否有函数描述
-                        desc = None
-                        if 'FUNCTION_DESCRIPTION' in content:
-                            try:
-                                # 尝试提取描述
-                                desc_start = content.find('FUNCTION_DESCRIPTION')
-                                desc_end = content.find('\n', desc_start)
-                                if desc_end != -1:
-                                    desc_line = content[desc_start:desc_end].strip()
-                                    desc = desc_line.split('=')[1].strip().strip('"\'')
-                            except Exception as e:
-                                logger.warning(f"提取函数描述失败: {str(e)}")
-                        
-                        if desc:
-                            logger.info(f"注册函数 {function_name} (描述: {desc})")
-                        else:
-                            logger.info(f"注册函数 {function_name} (无描述)")
-                        
-                        # 注册函数信息（不导入）
-                        self.function_registry[function_name] = {
-                            'file_path': file_path,
-                            'module_name': f"{self.name}.{function_name}",
-                            'description': desc,
-                            'loaded': False,
-                            'function': None
-                        }
-                        functions_registered += 1
+        with os.scandir(self.project_dir) as entries:
+            py_entries = [
+                entry for entry in entries
+                if entry.name.endswith('.py') and not entry.name.startswith('_') and entry.is_file()
+            ]
+        for entry in py_entries:
+            function_name = entry.name[:-3]
+            logger.info(f"尝试注册函数: {function_name}")
+            try:
+                # 映射文件内容按字节查找，不把整个文件解码为字符串
+                file_path = entry.path
+                has_main = False
+                desc_bytes = None
+                if entry.stat().st_size:
+                    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        has_main = mm.find(b'def main(') != -1
+                        desc_start = mm.find(b'FUNCTION_DESCRIPTION') if has_main else -1
+                        if desc_start != -1:
+                            desc_end = mm.find(b'\n', desc_start)
+                            if desc_end != -1:
+                                desc_bytes = mm[desc_start:desc_end]
+                    
+                # 检查是否有main函数
+                if has_main:
+                    # 检查是否有函数描述
+                    desc = None
+                    if desc_bytes is not None:
+                        try:
+                            # 尝试提取描述，只解码描述所在的一行
+                            desc_line = desc_bytes.decode('utf-8', 'replace').strip()
+                            desc = desc_line.split('=')[1].strip().strip('"\'')
+                        except Exception as e:
+                            logger.warning(f"提取函数描述失败: {str(e)}")
+                    
+                    if desc:
+                        logger.info(f"注册函数 {function_name} (描述: {desc})")
                     else:
-                        logger.warning(f"函数 {function_name} 没有main入口点")
-                except Exception as e:
-                    logger.error(f"注册函数 {function_name} 失败: {str(e)}", exc_info=True)
-        
+                        logger.info(f"注册函数 {function_name} (无描述)")
+                    
+                    # 预先编译为 .pyc（已是最新时跳过），之后导入只需加载字节码
+                    compileall.compile_file(file_path, quiet=2)
+                    
+                    # 注册函数信息（不导入）
+                    self.function_registry[function_name] = {
+                        'file_path': file_path,
+                        'module_name': f"{self.package_name}.{function_name}",
+                        'description': desc,
+                        'loaded': False,
+                        'function': None
+                    }
+                    functions_registered += 1
+                else:
+                    logger.warning(f"函数 {function_name} 没有main入口点")
+            except Exception as e:
+                logger.error(f"注册函数 {function_name} 失败: {str(e)}", exc_info=True)
+    
         logger.info(f"项目 {self.name} 注册了 {functions_registered} 个函数")
 
     def _load_functions(self):
         """加载项目函数（导入模块）"""
-        # 确保虚拟环境路径在sys.path的最前面
-        if sys.platform == "win32":
-            venv_site_packages = os.path.join(self.venv_dir, "Lib", "site-packages")
-        else:
-            python_version = f"python{sys.version_info.major}.{sys.version_info.minor}"
-            venv_site_packages = os.path.join(self.venv_dir, "lib", python_version, "site-packages")
+        # 只需把虚拟环境路径加到sys.path最前面供依赖导入；cloudfunction 包在 fork 前已由主进程导入，
+        # 其子模块经包的 __path__ 查找，不再插入 cloudfunction 目录。插入后刷新一次导入器缓存
+        if self._venv_site_packages not in sys.path and os.path.isdir(self._venv_site_packages):
+            sys.path.insert(0, self._venv_site_packages)
+            importlib.invalidate_caches()
+            logger.info(f"已添加虚拟环境路径到sys.path: {self._venv_site_packages}")
+            
+        # 注册项目包，函数模块及其互相导入只在项目目录中查找，不把项目父目录加入 sys.path
+        self._install_project_package()
         
-        if os.path.exists(venv_site_packages):
-            if venv_site_packages not in sys.path:
-                sys.path.insert(0, venv_site_packages)
-                logger.info(f"已添加虚拟环境路径到sys.path: {venv_site_packages}")
-            else:
-                logger.info(f"虚拟环境路径已在sys.path中: {venv_site_packages}")
-        else:
-            logger.error(f"虚拟环境site-packages路径不存在: {venv_site_packages}")
-            
-        # 确保cloudfunction目录在Python路径中
-        cloudfunction_dir = os.path.dirname(os.path.dirname(os.path.dirname(self.project_dir)))
-        if cloudfunction_dir not in sys.path and os.path.exists(cloudfunction_dir):
-            sys.path.insert(0, cloudfunction_dir)
-            logger.info(f"已添加cloudfunction目录到Python路径: {cloudfunction_dir}")
-            
-        # 确保项目所在目录在Python路径中
-        projects_parent_dir = os.path.dirname(self.project_dir)
-        if projects_parent_dir not in sys.path:
-            sys.path.insert(0, projects_parent_dir)
-            logger.info(f"已添加项目父目录到Python路径: {projects_parent_dir}")
+        # 默认不预先导入，函数模块在首次调用时由 _get_function 导入
+        if not PRELOAD_FUNCTIONS:
+            logger.info(f"项目 {self.name} 的函数将在首次调用时导入")
+            return
         
-        # 导入已注册的函数
-        functions_loaded = 0
+        # 并行导入已注册的函数（读取源码/字节码缓存的文件 I/O 可以重叠）
         logger.info(f"开始导入项目 {self.name} 的函数...")
-        for function_name, func_info in self.function_registry.items():
-            if not func_info['loaded']:
-                try:
-                    # 导入模块并获取函数对象
-                    module = importlib.import_module(func_info['module_name'])
-                    func = getattr(module, 'main')
-                    if callable(func):
-                        func_info['function'] = func
-                        func_info['loaded'] = True
-                        functions_loaded += 1
-                        logger.info(f"成功导入函数: {function_name}")
-                    else:
-                        logger.error(f"函数 {function_name} 不是可调用对象")
-                except Exception as e:
-                    logger.error(f"导入函数 {function_name} 失败: {str(e)}", exc_info=True)
+        pending = [name for name, info in self.function_registry.items() if not info['loaded']]
+        functions_loaded = sum(_EXECUTOR.map(self._try_load_function, pending))
         
         logger.info(f"项目 {self.name} 导入了 {functions_loaded} 个函数")
 
-    def run(self):
-        """运行项目进程"""
+    def _resolve_package_name(self) -> str:
+        """项目包名
+
+        通常为项目名，项目内可用 <项目名>.<模块> 绝对导入；项目名与进程中已导入的其他模块
+        重名时（如 json）改用 __cf_<项目名>__，避免覆盖或误用该模块。
+        """
+        module = sys.modules.get(self.name)
+        if module is None or list(getattr(module, '__path__', ())) == [self.project_dir]:
+            return self.name
+        logger.warning(f"项目名 {self.name} 与已导入的模块重名，项目包注册为 __cf_{self.name}__")
+        return f"__cf_{self.name}__"
+
+    def _install_project_package(self):
+        """将项目目录注册为包（包名见 _resolve_package_name）
+
+        包的 __path__ 只含项目目录，导入 <包名>.<模块> 时只查找这一个目录。
+        项目目录有 __init__.py 时执行它，否则注册为命名空间包。
+        """
+        if self.package_name in sys.modules:
+            return
+        init_path = os.path.join(self.project_dir, "__init__.py")
+        if os.path.exists(init_path):
+            spec = importlib.util.spec_from_file_location(
+                self.package_name, init_path, submodule_search_locations=[self.project_dir]
+            )
+        else:
+            spec = importlib.machinery.ModuleSpec(self.package_name, None, is_package=True)
+            spec.submodule_search_locations = [self.project_dir]
+        self._exec_spec(spec)
+
+    @staticmethod
+    def _exec_spec(spec):
+        """根据 spec 创建并执行模块，执行失败时从 sys.modules 移除"""
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[spec.name] = module
         try:
-            # 设置进程名称
-            process = psutil.Process()
-            process.name(f"cloudfunction-{self.name}")
-            
-            # 创建并设置事件循环
-            self.loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.loop)
-            
-            # 如果初始化失败，提前标记事件
-            if not self.initialized:
-                logger.warning(f"项目 {self.name} 初始化失败，无法处理函数请求")
-                self.event.set()  # 设置事件，表示进程已准备好（虽然失败）
-                # 不要立即退出，等待主进程可能的停止命令
-                
-                # 简单消息循环，只处理停止命令
-                while True:
-                    if not self.queue.empty():
-                        message = self.queue.get()
-                        logger.debug(f"收到消息: {message}")
-                        if message == "stop":
-                            logger.info(f"收到停止信号，正在停止项目 {self.name}")
-                            break
-                    time.sleep(1)  # 简单轮询，减少CPU使用
-                
-                return
-            
-            # 标记进程已准备好
-            self.event.set()
-            
-            # 运行事件循环
-            self.loop.run_until_complete(self._run_async())
-            
-        except Exception as e:
-            logger.error(f"项目进程异常退出: {self.name} - {str(e)}", exc_info=True)
-            # 确保事件被设置，即使发生错误
-            if not self.event.is_set():
-                self.event.set()
-            # 通知主进程
-            self.queue.put({
-                "status": "error",
-                "type": "process_error",
-                "error": str(e)
-            })
-            
-    async def _run_async(self):
-        """异步运行项目"""
-        while True:
-            try:
-                # 异步等待消息
-                message = await self._get_message()
-                
-                if message["type"] == "execute":
-                    # 创建协程任务
-                    task = asyncio.create_task(
-                        self.execute_function_async(
-                            message["function_name"],
-                            message["payload"]
-                        )
-                    )
-                    # 等待任务完成
-                    result = await task
-                    await self._put_message(result)
-                    
-            except Exception as e:
-                logger.error(f"处理消息失败: {str(e)}")
-                await self._put_message({
-                    "type": "error",
-                    "error": str(e)
-                })
-                
-    async def _get_message(self):
-        """异步获取消息"""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.queue.get)
-        
-    async def _put_message(self, message):
-        """异步发送消息"""
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, self.queue.put, message)
-        
+            if spec.loader is not None:
+                spec.loader.exec_module(module)
+        except BaseException:
+            sys.modules.pop(spec.name, None)
+            raise
+        return module
+
+    def _try_load_function(self, function_name: str) -> bool:
+        """导入单个函数，失败时已记录日志并返回 False"""
+        try:
+            self._get_function(function_name)
+            return True
+        except Exception:
+            return False
+
     async def execute_function_async(self, function_name: str, payload: Dict[str, Any]) -> Any:
-        """异步执行函数"""
+        """异步执行函数
+        
+        异步函数直接在当前事件循环中执行；同步函数交给共享线程池执行，
+        模块中声明 EXECUTOR = "process" 的同步函数交给共享进程池执行。
+        """
         if not self.initialized:
             raise RuntimeError("Project not initialized")
             
@@ -410,62 +475,77 @@ class ProjectProcess:
             raise ValueError(f"Function {function_name} not found")
             
         try:
-            # 使用线程池执行函数
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                self.executor,
-                self._execute_function,
-                function_name,
-                payload
-            )
-            return result
+            # 检查文件修改时间和(重新)导入模块都在线程池中进行，冷启动或重新加载
+            # 较慢的模块时不阻塞同一项目中其他正在执行的请求
+            loop = asyncio.get_running_loop()
+            func = await loop.run_in_executor(_EXECUTOR, self._get_function, function_name)
+            func_info = self.function_registry[function_name]
+            if func_info['is_async']:
+                return await func(payload)
+            if func_info['use_process']:
+                return await loop.run_in_executor(_get_process_executor(), func, payload)
+            return await loop.run_in_executor(_EXECUTOR, func, payload)
         except Exception as e:
             logger.error(f"函数执行失败: {function_name} - {str(e)}", exc_info=True)
             raise
 
-    def _execute_function(self, function_name: str, payload: Dict[str, Any]) -> Any:
-        """在线程池中执行函数"""
-        try:
-            # 获取函数信息
-            func_info = self.function_registry.get(function_name)
-            if not func_info:
-                raise ValueError(f"Function {function_name} not found")
-            
-            # 如果函数未加载，尝试加载
-            if not func_info['loaded']:
-                try:
-                    module = importlib.import_module(func_info['module_name'])
-                    func = getattr(module, 'main')
-                    if callable(func):
-                        func_info['function'] = func
-                        func_info['loaded'] = True
-                        logger.info(f"成功导入函数: {function_name}")
-                    else:
-                        raise ValueError(f"Function {function_name} is not callable")
-                except Exception as e:
-                    logger.error(f"导入函数 {function_name} 失败: {str(e)}", exc_info=True)
-                    raise
-            
-            # 获取函数对象
-            func = func_info['function']
+    def _get_function(self, function_name: str):
+        """获取函数对象
+        
+        已加载且文件未修改时直接复用缓存的函数对象，否则(重新)导入。
+        可在多个线程中同时调用，同一函数的导入按函数加锁，只进行一次。
+        
+        Args:
+            function_name: 函数名称
             
-            # 执行函数
-            if asyncio.iscoroutinefunction(func):
-                # 如果是异步函数，创建新的事件循环
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    result = loop.run_until_complete(func(payload))
-                finally:
-                    loop.close()
-            else:
-                # 如果是同步函数，直接执行
-                result = func(payload)
-                
-            return result
-        except Exception as e:
-            logger.error(f"函数执行失败: {function_name} - {str(e)}", exc_info=True)
-            raise
+        Returns:
+            函数的 main 入口
+        """
+        func_info = self.function_registry.get(function_name)
+        if not func_info:
+            raise ValueError(f"Function {function_name} not found")
+        
+        mtime = os.stat(func_info['file_path']).st_mtime_ns
+        if func_info['loaded'] and func_info.get('mtime') == mtime:
+            return func_info['function']
+        
+        with self._load_locks.setdefault(function_name, threading.Lock()):
+            # 等待锁期间其他线程可能已完成导入
+            if func_info['loaded'] and func_info.get('mtime') == mtime:
+                return func_info['function']
+            try:
+                module_name = func_info['module_name']
+                module = sys.modules.get(module_name)
+                if module is not None:
+                    module = importlib.reload(module)
+                    # 进程池的工作进程仍持有旧模块
+                    _reset_process_executor()
+                else:
+                    # 已知文件路径，直接按路径加载，不经 sys.path 查找
+                    module = self._exec_spec(
+                        importlib.util.spec_from_file_location(module_name, func_info['file_path'])
+                    )
+                # 直接查模块字典，缺少 main 时得到 None
+                namespace = module.__dict__
+                func = namespace.get('main')
+                if callable(func):
+                    func_info['function'] = func
+                    func_info['mtime'] = mtime
+                    func_info['loaded'] = True
+                    # 函数类型在加载时确定，执行时不再判断
+                    func_info['is_async'] = asyncio.iscoroutinefunction(func)
+                    func_info['use_process'] = namespace.get('EXECUTOR') == "process"
+                    description = namespace.get('FUNCTION_DESCRIPTION')
+                    if isinstance(description, str):
+                        func_info['description'] = description
+                    logger.info(f"成功导入函数: {function_name}")
+                else:
+                    raise ValueError(f"Function {function_name} is not callable")
+            except Exception as e:
+                logger.error(f"导入函数 {function_name} 失败: {str(e)}", exc_info=True)
+                raise
+        
+        return func_info['function']
 
 class ProjectManager:
     """项目管理器"""
@@ -490,13 +570,14 @@ class ProjectManager:
         """
         try:
             # 延迟导入，避免循环依赖
-            from .master import get_master
+            from . import get_master
             master = get_master()
             if not master:
                 raise Exception("无法获取主进程实例")
                 
-            # 启动项目进程
-            master._start_project_process(project_name)
+            # 在线程中启动项目进程：虚拟环境创建和依赖安装在各自的项目进程中进行，
+            # 多个项目并发启动（asyncio.gather）时互不阻塞
+            await asyncio.to_thread(master._start_project_process, project_name)
             return True
             
         except Exception as e:
@@ -514,7 +595,7 @@ class ProjectManager:
         """
         try:
             # 延迟导入，避免循环依赖
-            from .master import get_master
+            from . import get_master
             master = get_master()
             if not master:
                 raise Exception("无法获取主进程实例")
@@ -540,7 +621,7 @@ class ProjectManager:
         """
         try:
             # 延迟导入，避免循环依赖
-            from .master import get_master
+            from . import get_master
             master = get_master()
             if not master:
                 raise Exception("无法获取主进程实例")
@@ -5,12 +5,11 @@ from typing import List, Dict
 import importlib.util
 import subprocess
 from dotenv import load_dotenv
-import venv
-import sys
 from threading import Lock
+from functools import lru_cache
 import ast
 from cloudfunction.utils.logger import get_logger
-from cloudfunction.core.env import VENVS_DIR
+from cloudfunction.core.env import EnvManager, PIP_INSTALL_FLAGS, VENVS_DIR
 
 # 设置日志
 logger = get_logger(__name__)
@@ -26,53 +25,69 @@ class FunctionRegistry:
         self.scan_all_projects()
 
     def scan_all_projects(self):
-        for project_name in os.listdir(self.projects_dir):
-            project_path = os.path.join(self.projects_dir, project_name)
-            if os.path.isdir(project_path):
-                self.register_project_functions(project_name, project_path)
+        with os.scandir(self.projects_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.register_project_functions(entry.name, entry.path)
 
     def register_project_functions(self, project_name, project_path):
-        for file in os.listdir(project_path):
-            if file.endswith('.py'):
-                func_name = file[:-3]
-                file_path = os.path.join(project_path, file)
-                self.registry[(project_name, func_name)] = {
-                    "file_path": file_path,
-                    "entry": "main"  # 默认入口名，可扩展
-                }
+        with os.scandir(project_path) as entries:
+            for entry in entries:
+                if entry.name.endswith('.py'):
+                    func_name = entry.name[:-3]
+                    self.registry[(project_name, func_name)] = {
+                        "file_path": entry.path,
+                        "entry": "main"  # 默认入口名，可扩展
+                    }
 
     def get_function(self, project_name, function_name):
         return self.registry.get((project_name, function_name))
 
     def _init_projects(self):
         """初始化项目列表"""
-        for project_name in os.listdir(self.projects_dir):
-            project_path = os.path.join(self.projects_dir, project_name)
-            if os.path.isdir(project_path):
-                self.projects[project_name] = {
-                    "path": project_path,
-                    "functions": {},
-                    "env_loaded": False
-                }
-                self._load_project_functions(project_name)
+        with os.scandir(self.projects_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    self.projects[entry.name] = {
+                        "path": entry.path,
+                        "functions": {},
+                        "env_loaded": False
+                    }
+                    self._load_project_functions(entry.name)
 
     def _load_project_functions(self, project_name: str):
         """加载项目中的函数"""
         project_path = self.projects[project_name]["path"]
-        for file_name in os.listdir(project_path):
-            if file_name.endswith('.py') and not file_name.startswith('test_'):
-                func_name = os.path.splitext(file_name)[0]
-                func_path = os.path.join(project_path, file_name)
-                description = self._load_function_description(func_path)
-                self.projects[project_name]["functions"][func_name] = {
-                    "path": func_path,
-                    "status": "deployed",
-                    "description": description
-                }
-                logger.info(f"Loaded function {func_name} from project {project_name}")
+        with os.scandir(project_path) as entries:
+            for entry in entries:
+                file_name = entry.name
+                if file_name.endswith('.py') and not file_name.startswith('test_'):
+                    func_name = os.path.splitext(file_name)[0]
+                    description = self._load_function_description(entry.path)
+                    self.projects[project_name]["functions"][func_name] = {
+                        "path": entry.path,
+                        "status": "deployed",
+                        "description": description
+                    }
+                    logger.info(f"Loaded function {func_name} from project {project_name}")
 
     def _load_function_description(self, func_path: str) -> Dict:
-        """使用 AST 解析函数描述信息"""
+        """使用 AST 解析函数描述信息（按文件修改时间缓存，文件未变化时不再解析）"""
+        try:
+            mtime = os.stat(func_path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Error loading function description from {func_path}: {e}")
+            return {
+                "name": os.path.basename(func_path),
+                "description": "Error loading description"
+            }
+        # 返回副本，调用方修改不影响缓存
+        return dict(self._parse_function_description(func_path, mtime))
+
+    @staticmethod
+    @lru_cache(maxsize=512)
+    def _parse_function_description(func_path: str, mtime: int) -> Dict:
+        """解析函数文件中的 FUNCTION_DESCRIPTION，按 (路径, 修改时间) 缓存"""
         try:
             with open(func_path, 'r', encoding='utf-8') as f:
                 tree = ast.parse(f.read())
@@ -121,20 +136,12 @@ class FunctionRegistry:
         return os.path.join(self.venvs_dir, project_name)
 
     def _get_venv_python(self, project_name: str) -> str:
-        """获取项目的虚拟环境 Python 解释器路径"""
-        venv_path = self._get_venv_path(project_name)
-        if sys.platform == "win32":
-            return os.path.join(venv_path, "Scripts", "python.exe")
-        else:
-            return os.path.join(venv_path, "bin", "python")
+        """获取项目的虚拟环境 Python 解释器路径（EnvManager 按项目缓存）"""
+        return EnvManager.get_venv_python(project_name)
 
     def _get_venv_pip(self, project_name: str) -> str:
-        """获取项目的虚拟环境 pip 路径"""
-        venv_path = self._get_venv_path(project_name)
-        if sys.platform == "win32":
-            return os.path.join(venv_path, "Scripts", "pip.exe")
-        else:
-            return os.path.join(venv_path, "bin", "pip")
+        """获取项目的虚拟环境 pip 路径（EnvManager 按项目缓存）"""
+        return EnvManager.get_venv_pip(project_name)
 
     def _create_venv(self, project_name: str) -> bool:
         """创建项目的虚拟环境"""
@@ -146,7 +153,7 @@ class FunctionRegistry:
                     return True
                 
                 logger.info(f"Creating virtual environment for project {project_name}")
-                venv.create(venv_path, with_pip=True)
+                EnvManager.create_venv(venv_path)
                 return True
         except Exception as e:
             logger.error(f"Error creating virtual environment for project {project_name}: {e}")
@@ -161,6 +168,12 @@ class FunctionRegistry:
                 requirements_lock = os.path.join(project_dir, "requirements.lock")
                 
                 pip_path = self._get_venv_pip(project_name)
+                # 优先使用 uv（编译 lock 文件和安装都不需要额外安装 pip-tools），未安装时使用 pip
+                uv_path = EnvManager.get_uv_path()
+                if uv_path:
+                    install_cmd = [uv_path, "pip", "install", "--python", self._get_venv_python(project_name), "--compile-bytecode"]
+                else:
+                    install_cmd = [pip_path, "install", *PIP_INSTALL_FLAGS]
                 
                 # 检查文件是否存在
                 txt_exists = os.path.exists(requirements_txt)
@@ -179,15 +192,19 @@ class FunctionRegistry:
                     if txt_mtime > lock_mtime:
                         logger.info(f"检测到 requirements.txt 更新，重新生成 lock 文件")
                         try:
-                            # 检查是否安装了pip-compile
-                            pip_compile_path = os.path.join(os.path.dirname(pip_path), "pip-compile")
-                            if not os.path.exists(pip_compile_path):
-                                logger.info("安装 pip-tools 用于生成 lock 文件")
-                                subprocess.run([pip_path, "install", "pip-tools"], check=True)
+                            if uv_path:
+                                compile_cmd = [uv_path, "pip", "compile"]
+                            else:
+                                # 检查是否安装了pip-compile
                                 pip_compile_path = os.path.join(os.path.dirname(pip_path), "pip-compile")
+                                if not os.path.exists(pip_compile_path):
+                                    logger.info("安装 pip-tools 用于生成 lock 文件")
+                                    subprocess.run([pip_path, "install", *PIP_INSTALL_FLAGS, "pip-tools"], check=True)
+                                    pip_compile_path = os.path.join(os.path.dirname(pip_path), "pip-compile")
+                                compile_cmd = [pip_compile_path]
                             
                             # 重新生成lock文件
-                            subprocess.run([pip_compile_path, requirements_txt, "--output-file", requirements_lock], check=True)
+                            subprocess.run([*compile_cmd, requirements_txt, "--output-file", requirements_lock], check=True)
                             logger.info(f"成功更新 requirements.lock 文件")
                         except Exception as e:
                             logger.error(f"更新 lock 文件失败: {e}")
@@ -195,11 +212,12 @@ class FunctionRegistry:
                 
                 # 安装依赖
                 if lock_exists:
+                    # lock 文件已固定全部（含传递）依赖版本，--no-deps 跳过依赖解析
                     logger.info(f"从 requirements.lock 安装依赖: {project_name}")
-                    subprocess.run([pip_path, "install", "-r", requirements_lock], check=True)
+                    subprocess.run([*install_cmd, "--no-deps", "-r", requirements_lock], check=True)
                 elif txt_exists:
                     logger.info(f"从 requirements.txt 安装依赖: {project_name}")
-                    subprocess.run([pip_path, "install", "-r", requirements_txt], check=True)
+                    subprocess.run([*install_cmd, "-r", requirements_txt], check=True)
                 
                 return True
         except Exception as e:
@@ -297,6 +315,10 @@ class FunctionRegistry:
             for name, info in self.projects.items()
         ]
 
+    def project_count(self) -> int:
+        """项目数量（不构建项目列表）"""
+        return len(self.projects)
+
     def list_project_functions(self, project_name: str) -> List[Dict]:
         """列出项目中的所有函数"""
         if project_name not in self.projects:
@@ -325,6 +347,9 @@ class FunctionRegistry:
             # 删除虚拟环境
             if os.path.exists(venv_path):
                 shutil.rmtree(venv_path)
+            # 延迟导入，避免循环依赖
+            from .executor import forget_venv
+            forget_venv(project_name)
             # 从注册表中移除
             del self.projects[project_name]
             logger.info(f"Project {project_name} deleted successfully")
@@ -3,13 +3,21 @@
 """
 
 import os
-from multiprocessing import Manager, Lock, Queue, Event, Process
+import asyncio
+import multiprocessing
+from multiprocessing import Queue, Event, resource_tracker
 from typing import Dict, Any, Optional
 from cloudfunction.utils.logger import get_logger
+from .channel import ReadySignal, ShmChannel, SpscQueue
 
 # 设置日志
 logger = get_logger(__name__)
 
+# 项目进程统一使用 fork 启动：子进程直接继承主进程已导入模块和已初始化的解释器状态，
+# 不必重新导入；进程目标是 Master 的绑定方法，也无法在 spawn/forkserver 下序列化。
+# 不支持 fork 的平台（Windows）回退到默认启动方式。
+_mp = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+
 class ServerState:
     _instance = None
     _initialized = False
@@ -22,7 +30,7 @@ class ServerState:
     def __init__(self):
         if not self._initialized:
             # 初始化管理器
-            self._manager = Manager()
+            self._manager = _mp.Manager()
             
             # 核心系统组件管理
             # 这些组件是系统基础设施，使用注册机制确保有序初始化和访问
@@ -41,9 +49,22 @@ class ServerState:
             # 进程管理（使用普通字典，因为进程对象不需要跨进程共享）
             self._processes = {}
             
+            # 进程存活状态缓存：由事件循环监听进程 sentinel，退出时置为 False；
+            # 未被监听的进程回退到 is_alive()
+            self._alive = {}
+            self._loop = None
+            
+            # 已观察到就绪事件被设置的项目：就绪状态在进程生命周期内不会撤销，
+            # 记录后不再读取跨进程 Event
+            self._ready = set()
+            
+            # 等待项目就绪的 Future，由就绪信号读端可读时完成
+            self._ready_waiters: Dict[str, asyncio.Future] = {}
+            
             # 进程间通信对象
             self._shared = {
-                'project_queues': {},    # 项目队列
+                'project_queues': {},    # 项目请求队列（主进程 -> 项目进程）
+                'project_out_queues': {},  # 项目响应队列（项目进程 -> 主进程）
                 'project_events': {},    # 项目事件
                 'task_queues': {},       # 任务队列（新增）
                 'task_events': {},       # 任务事件（新增）
@@ -132,36 +153,68 @@ class ServerState:
             raise ValueError(f"Unknown shared object: {name}")
         return self._shared[name]
 
-    def create_queue(self, project_name: str) -> Queue:
+    def create_queue(self, project_name: str) -> ShmChannel:
         """创建项目队列"""
         if project_name not in self._shared['project_queues']:
-            self._shared['project_queues'][project_name] = Queue()
+            self._shared['project_queues'][project_name] = ShmChannel(_mp.Queue())
         return self._shared['project_queues'][project_name]
 
-    def create_event(self, project_name: str) -> Event:
-        """创建项目事件"""
-        if project_name not in self._shared['project_events']:
-            self._shared['project_events'][project_name] = Event()
-        return self._shared['project_events'][project_name]
-
-    def get_queue(self, project_name: str) -> Optional[Queue]:
+    def create_out_queue(self, project_name: str) -> ShmChannel:
+        """创建项目响应队列"""
+        if project_name not in self._shared['project_out_queues']:
+            # 响应方向只有项目进程事件循环一个生产者（主进程只在项目进程终止后写入 None），
+            # 且主进程只有一个读取线程：使用 SpscQueue 直接读写管道，不加锁也没有后台发送线程
+            self._shared['project_out_queues'][project_name] = ShmChannel(SpscQueue())
+        return self._shared['project_out_queues'][project_name]
+
+    def create_event(self, project_name: str) -> ReadySignal:
+        """创建项目就绪信号（每次启动进程都新建，写端只属于该进程）"""
+        event = ReadySignal(_mp.Event())
+        old_event = self._shared['project_events'].get(project_name)
+        self._shared['project_events'][project_name] = event
+        if old_event is not None:
+            self._release_event(project_name, old_event)
+        return event
+
+    def _release_event(self, project_name: str, event: ReadySignal) -> None:
+        """关闭不再使用的就绪信号，仍在等待它的 Future 先完成（可在任意线程调用）"""
+        future = self._ready_waiters.pop(project_name, None)
+        if future is None or future.get_loop().is_closed():
+            event.close()
+            return
+        loop = future.get_loop()
+
+        def _close():
+            # 读端注销后再关闭，等待者醒来后按未就绪处理
+            if not future.done():
+                loop.remove_reader(event.fileno())
+                future.set_result(None)
+            event.close()
+
+        loop.call_soon_threadsafe(_close)
+
+    def get_queue(self, project_name: str) -> Optional[ShmChannel]:
         """获取项目队列"""
         return self._shared['project_queues'].get(project_name)
 
-    def get_event(self, project_name: str) -> Optional[Event]:
-        """获取项目事件"""
+    def get_out_queue(self, project_name: str) -> Optional[ShmChannel]:
+        """获取项目响应队列"""
+        return self._shared['project_out_queues'].get(project_name)
+
+    def get_event(self, project_name: str) -> Optional[ReadySignal]:
+        """获取项目就绪信号"""
         return self._shared['project_events'].get(project_name)
 
     def create_task_queue(self, task_id: str) -> Queue:
         """创建任务队列"""
         if task_id not in self._shared['task_queues']:
-            self._shared['task_queues'][task_id] = Queue()
+            self._shared['task_queues'][task_id] = _mp.Queue()
         return self._shared['task_queues'][task_id]
 
     def create_task_event(self, task_id: str) -> Event:
         """创建任务事件"""
         if task_id not in self._shared['task_events']:
-            self._shared['task_events'][task_id] = Event()
+            self._shared['task_events'][task_id] = _mp.Event()
         return self._shared['task_events'][task_id]
 
     def get_task_queue(self, task_id: str) -> Optional[Queue]:
@@ -172,21 +225,103 @@ class ServerState:
         """获取任务事件"""
         return self._shared['task_events'].get(task_id)
 
-    def check_process_status(self, project_name: str) -> bool:
-        """检查项目进程状态"""
-        if project_name not in self._processes:
+    def set_event_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """设置用于监听项目进程退出的事件循环"""
+        self._loop = loop
+
+    def _watch_process(self, project_name: str, process) -> None:
+        """在事件循环中监听进程 sentinel，进程退出时更新存活状态（可在任意线程调用）"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        def _register():
+            try:
+                loop.add_reader(process.sentinel, _on_exit)
+            except (NotImplementedError, ValueError, OSError):
+                # 事件循环不支持 add_reader（如 Windows），回退到 is_alive()
+                return
+            if self._processes.get(project_name) is process:
+                self._alive[project_name] = True
+
+        def _on_exit():
+            loop.remove_reader(process.sentinel)
+            if self._processes.get(project_name) is process:
+                self._alive[project_name] = False
+
+        loop.call_soon_threadsafe(_register)
+
+    def is_process_alive(self, project_name: str) -> bool:
+        """项目进程是否存活，被监听的进程直接读取缓存，不调用 waitpid"""
+        process = self._processes.get(project_name)
+        if process is None:
             return False
-            
-        process = self._processes[project_name]
-        if not process.is_alive():
+        alive = self._alive.get(project_name)
+        if alive is None:
+            return process.is_alive()
+        return alive
+
+    def is_process_ready(self, project_name: str) -> bool:
+        """项目进程是否已设置就绪事件，首次观察到后直接读取缓存"""
+        if project_name in self._ready:
+            return True
+        event = self._shared['project_events'].get(project_name)
+        if event is None or not event.is_set():
             return False
+        self._ready.add(project_name)
+        return True
+
+    async def wait_until_ready(self, project_name: str) -> None:
+        """等待项目进程就绪（无超时限制）
+        
+        就绪信号的读端注册到事件循环，子进程 set 或退出时立即唤醒；
+        同一项目的多个等待者共用一个 Future。事件循环不支持 add_reader 时回退到线程中等待。
+        
+        Args:
+            project_name: 项目名称
             
-        # 检查事件是否已设置
-        event = self.get_event(project_name)
-        if not event or not event.is_set():
-            return False
+        Raises:
+            ValueError: 项目进程未启动
+            Exception: 项目进程未就绪即退出
+        """
+        if self.is_process_ready(project_name):
+            return
+        event = self._shared['project_events'].get(project_name)
+        process = self._processes.get(project_name)
+        if event is None or process is None:
+            raise ValueError(f"Project {project_name} is not running")
+        
+        future = self._ready_waiters.get(project_name)
+        if future is None or future.done():
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            fd = event.fileno()
             
-        return True
+            def _on_readable():
+                loop.remove_reader(fd)
+                if self._ready_waiters.get(project_name) is future:
+                    del self._ready_waiters[project_name]
+                if not future.done():
+                    future.set_result(None)
+            
+            try:
+                loop.add_reader(fd, _on_readable)
+            except NotImplementedError:
+                # 事件循环不支持 add_reader（如 Windows），在线程中等待，每秒检查进程是否退出
+                while not await asyncio.to_thread(event.wait, 1):
+                    if not process.is_alive():
+                        raise Exception(f"Project {project_name} process exited before becoming ready")
+                return
+            self._ready_waiters[project_name] = future
+        
+        # 共用的 Future 不随单个等待者取消
+        await asyncio.shield(future)
+        if not self.is_process_ready(project_name):
+            raise Exception(f"Project {project_name} process exited before becoming ready")
+
+    def check_process_status(self, project_name: str) -> bool:
+        """检查项目进程状态（存活且已就绪）"""
+        return self.is_process_alive(project_name) and self.is_process_ready(project_name)
 
     def start_project_process(self, project_name: str, target_func, args: tuple = None) -> bool:
         """启动项目进程"""
@@ -203,16 +338,26 @@ class ServerState:
 
             # 创建进程间通信队列和事件
             queue = self.create_queue(project_name)
+            out_queue = self.create_out_queue(project_name)
             event = self.create_event(project_name)
+            self._ready.discard(project_name)
+
+            # 在 fork 前启动 resource_tracker，项目进程与主进程共用同一个，
+            # 任一方创建的共享内存段未被释放时都在主进程退出时清理
+            if os.name != "nt":
+                resource_tracker.ensure_running()
 
             # 创建并启动项目进程
-            process = Process(
+            process = _mp.Process(
                 target=target_func,
-                args=(project_name, queue, event) + (args or ()),
+                args=(project_name, queue, event, out_queue) + (args or ()),
                 daemon=True
             )
             process.start()
+            # 只有子进程持有写端，子进程未就绪即退出时读端得到 EOF
+            event.close_writer()
             self._processes[project_name] = process
+            self._watch_process(project_name, process)
             self._log_operation('info', project_name, 'start', '进程启动成功')
             return True
             
@@ -255,14 +400,24 @@ class ServerState:
             self.terminate_process(project_name)
             
             # 清理队列和事件
-            if project_name in self._shared['project_queues']:
-                del self._shared['project_queues'][project_name]
-            if project_name in self._shared['project_events']:
-                del self._shared['project_events'][project_name]
+            queue = self._shared['project_queues'].pop(project_name, None)
+            if queue is not None:
+                # 项目进程已终止，未读取的请求中的共享内存改由主进程释放
+                queue.discard_pending()
+                queue.close()
+            out_queue = self._shared['project_out_queues'].pop(project_name, None)
+            if out_queue is not None:
+                # 唤醒主进程中阻塞读取响应的线程，使其退出
+                out_queue.put(None)
+            event = self._shared['project_events'].pop(project_name, None)
+            if event is not None:
+                self._release_event(project_name, event)
                 
             # 清理进程记录
             if project_name in self._processes:
                 del self._processes[project_name]
+            self._alive.pop(project_name, None)
+            self._ready.discard(project_name)
                 
             # 清理执行器
             if project_name in self._executors:
@@ -328,11 +483,18 @@ class ServerState:
             # 2. 清理共享资源
             try:
                 for queue in self._shared['project_queues'].values():
+                    queue.discard_pending()
+                    queue.close()
+                for queue in self._shared['project_out_queues'].values():
+                    queue.put(None)
                     queue.close()
-                for event in self._shared['project_events'].values():
+                for project_name, event in self._shared['project_events'].items():
                     event.clear()
+                    self._release_event(project_name, event)
                 self._shared['project_queues'].clear()
+                self._shared['project_out_queues'].clear()
                 self._shared['project_events'].clear()
+                self._ready.clear()
             except Exception as e:
                 logger.error(f"清理共享资源时出错: {str(e)}", exc_info=True)
             
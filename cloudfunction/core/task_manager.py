@@ -3,7 +3,7 @@ import logging
 import os
 import time
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import json
 import yaml
@@ -15,6 +15,15 @@ import threading
 
 logger = get_logger(__name__)
 
+class TaskNotFoundError(Exception):
+    """任务不存在"""
+
+class TaskNotOwnedError(Exception):
+    """任务不属于指定的函数"""
+
+class TaskNotCancellableError(Exception):
+    """任务当前状态不允许取消"""
+
 class TaskManager:
     """统一的任务管理器，同时处理普通任务和定时任务"""
     
@@ -26,6 +35,8 @@ class TaskManager:
         """
         self.state = state
         self.tasks: Dict[str, Dict[str, Any]] = {}
+        # (project_name, function_name) -> 任务ID索引，按插入顺序保存
+        self.function_tasks: Dict[Tuple[str, str], Dict[str, None]] = {}
         self.task_lock = threading.Lock()
         self.executor = ThreadPoolExecutor(max_workers=10)
         self.task_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tasks")
@@ -33,6 +44,7 @@ class TaskManager:
         
         # 初始化定时任务调度器
         self.scheduler = BackgroundScheduler(timezone="Asia/Shanghai")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # 定时任务提交到的主事件循环，start 时记录
         self.config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "scheduler_config.yaml")
         
     def _generate_task_id(self, project_name: str, function_name: str) -> str:
@@ -53,11 +65,17 @@ class TaskManager:
                 return json.load(f)
         return None
         
+    def _add_task(self, task_id: str, task_info: Dict[str, Any]):
+        """登记任务并更新函数索引（调用方需持有 task_lock）"""
+        self.tasks[task_id] = task_info
+        key = (task_info["project_name"], task_info["function_name"])
+        self.function_tasks.setdefault(key, {})[task_id] = None
+        
     def _get_running_task(self, project_name: str, function_name: str) -> Optional[Dict[str, Any]]:
         """获取正在运行的任务"""
-        prefix = f"{project_name}_{function_name}"
-        for task_id, task_info in self.tasks.items():
-            if task_id.startswith(prefix) and task_info["status"] in ["created", "running"]:
+        for task_id in self.function_tasks.get((project_name, function_name), ()):
+            task_info = self.tasks[task_id]
+            if task_info["status"] in ["created", "running"]:
                 return task_info
         return None
         
@@ -82,7 +100,7 @@ class TaskManager:
         }
         
         with self.task_lock:
-            self.tasks[task_id] = task_info
+            self._add_task(task_id, task_info)
             self._save_task_state(task_id, task_info)
             
         # 创建任务队列和事件
@@ -146,7 +164,7 @@ class TaskManager:
         task_info = self._load_task_state(task_id)
         if task_info:
             with self.task_lock:
-                self.tasks[task_id] = task_info
+                self._add_task(task_id, task_info)
             return task_info
             
         return None
@@ -168,6 +186,20 @@ class TaskManager:
         except Exception as e:
             logger.error(f"清理任务文件失败: {str(e)}", exc_info=True)
             
+    def _submit_scheduled_task(self, task_config: Dict[str, Any]):
+        """定时任务回调，在调度器线程中执行，把任务创建提交到主事件循环
+        
+        Args:
+            task_config: 定时任务配置
+        """
+        if self.loop is None or self.loop.is_closed():
+            logger.error(f"主事件循环不可用，跳过定时任务: {task_config.get('project')}/{task_config.get('function')}")
+            return
+        asyncio.run_coroutine_threadsafe(
+            self.create_task(task_config["project"], task_config["function"], task_config.get("args", {})),
+            self.loop
+        )
+        
     def setup_scheduler(self):
         """设置定时任务"""
         try:
@@ -180,15 +212,14 @@ class TaskManager:
                 schedule = task_config.get("schedule", {})
                 if schedule.get("type") == "cron":
                     self.scheduler.add_job(
-                        lambda t=task_config: asyncio.create_task(
-                            self.create_task(t["project"], t["function"], t.get("args", {}))
-                        ),
+                        self._submit_scheduled_task,
                         CronTrigger(
                             day_of_week=schedule.get("day_of_week"),
                             hour=schedule.get("hour"),
                             minute=schedule.get("minute"),
                             week=schedule.get("week")
                         ),
+                        args=[task_config],
                         id=f"system_{task_id}",
                         replace_existing=True
                     )
@@ -199,15 +230,14 @@ class TaskManager:
                     schedule = task_config.get("schedule", {})
                     if schedule.get("type") == "cron":
                         self.scheduler.add_job(
-                            lambda t=task_config: asyncio.create_task(
-                                self.create_task(t["project"], t["function"], t.get("args", {}))
-                            ),
+                            self._submit_scheduled_task,
                             CronTrigger(
                                 day_of_week=schedule.get("day_of_week"),
                                 hour=schedule.get("hour"),
                                 minute=schedule.get("minute"),
                                 week=schedule.get("week")
                             ),
+                            args=[task_config],
                             id=f"project_{project}_{task_id}",
                             replace_existing=True
                         )
@@ -219,6 +249,11 @@ class TaskManager:
     def start(self):
         """启动任务管理器"""
         try:
+            # 调度器在自己的线程中触发任务，任务需要回到调用方所在的事件循环中执行
+            try:
+                self.loop = asyncio.get_running_loop()
+            except RuntimeError:
+                logger.warning("任务管理器未在事件循环中启动，定时任务将无法执行")
             self.setup_scheduler()
             self.scheduler.start()
             logger.info("任务管理器启动成功")
@@ -233,22 +268,40 @@ class TaskManager:
         except Exception as e:
             logger.error(f"关闭任务管理器失败: {str(e)}", exc_info=True)
             
-    async def list_tasks(self, project_name: Optional[str] = None, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def list_tasks(
+        self,
+        project_name: Optional[str] = None,
+        status: Optional[str] = None,
+        function_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
         """列出所有任务
         
         Args:
             project_name: 可选，按项目名称过滤
             status: 可选，按状态过滤
+            function_name: 可选，按函数名称过滤（与 project_name 同时提供时走索引）
             
         Returns:
             任务列表
         """
         tasks = []
         with self.task_lock:
+            if project_name and function_name:
+                # 直接从函数索引取任务，不扫描全部任务
+                task_ids = self.function_tasks.get((project_name, function_name), ())
+                for task_id in task_ids:
+                    task_info = self.tasks[task_id]
+                    if status and task_info["status"] != status:
+                        continue
+                    tasks.append(task_info)
+                return tasks
+                
             for task_id, task_info in self.tasks.items():
                 # 应用过滤器
                 if project_name and task_info["project_name"] != project_name:
                     continue
+                if function_name and task_info["function_name"] != function_name:
+                    continue
                 if status and task_info["status"] != status:
                     continue
                 tasks.append(task_info)
@@ -287,4 +340,45 @@ class TaskManager:
             
         except Exception as e:
             logger.error(f"取消任务失败: {str(e)}", exc_info=True)
-            return False 
\ No newline at end of file
+            return False
+
+    async def cancel_task_for_function(self, task_id: str, project_name: str, function_name: str) -> Dict[str, Any]:
+        """取消指定函数的任务
+        
+        归属校验和状态更新在同一把锁内完成，避免先查询后取消之间状态被修改。
+        
+        Args:
+            task_id: 任务ID
+            project_name: 项目名称
+            function_name: 函数名称
+            
+        Returns:
+            取消后的任务信息
+            
+        Raises:
+            TaskNotFoundError: 任务不存在
+            TaskNotOwnedError: 任务不属于指定的函数
+            TaskNotCancellableError: 任务状态不允许取消
+        """
+        # 内存中不存在时从文件加载
+        task_info = await self.get_task_status(task_id)
+        if not task_info:
+            raise TaskNotFoundError(f"Task {task_id} not found")
+            
+        with self.task_lock:
+            if task_info["project_name"] != project_name or task_info["function_name"] != function_name:
+                raise TaskNotOwnedError(f"Task {task_id} does not belong to function {function_name}")
+                
+            if task_info["status"] not in ["created", "running"]:
+                raise TaskNotCancellableError(f"Task {task_id} cannot be cancelled")
+                
+            # 更新任务状态
+            task_info["status"] = "cancelled"
+            task_info["updated_at"] = datetime.now().isoformat()
+            self._save_task_state(task_id, task_info)
+            
+        # 清理任务资源
+        self.state.cleanup_task_resources(task_id)
+        
+        logger.info(f"任务已取消: {task_id}")
+        return task_info
@@ -10,6 +10,7 @@ import logging
 from cloudfunction.utils.logger import setup_logging, get_logger
 from cloudfunction.core.task_manager import TaskManager
 from cloudfunction.core.state import ServerState
+from cloudfunction.utils.loop import install_event_loop_policy
 
 logger = get_logger(__name__)
 
@@ -49,6 +50,7 @@ async def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    install_event_loop_policy()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
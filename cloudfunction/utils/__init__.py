@@ -2,22 +2,56 @@
 工具函数模块
 """
 
-from .logger import get_logger, setup_logging, get_project_logger
-from .db import get_db_manager, close_all_connections, get_connection_status, reset_connection_pool
-from .llm import get_llm_client
+import importlib
+import os
+
+# 延迟导入映射：名称 -> (模块, 属性)，首次访问时才导入（db/llm 依赖较重）
+_LAZY = {
+    # 日志相关
+    'get_logger': ('.logger', 'get_logger'),
+    'setup_logging': ('.logger', 'setup_logging'),
+    'get_project_logger': ('.logger', 'get_project_logger'),
+
+    # 数据库相关
+    'get_db_manager': ('.db', 'get_db_manager'),
+    'close_all_connections': ('.db', 'close_all_connections'),
+    'get_connection_status': ('.db', 'get_connection_status'),
+    'reset_connection_pool': ('.db', 'reset_connection_pool'),
+
+    # LLM相关
+    'get_llm_client': ('.llm', 'get_llm_client'),
+}
+
+def __getattr__(name):
+    """首次访问时导入并缓存到模块全局变量"""
+    spec = _LAZY.get(name)
+    if spec is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attr = spec
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    # 写入模块全局变量后，后续访问不再经过 __getattr__
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
 
 __all__ = [
     # 日志相关
     'get_logger',
     'setup_logging',
     'get_project_logger',
-    
+
     # 数据库相关
     'get_db_manager',
     'close_all_connections',
     'get_connection_status',
     'reset_connection_pool',
-    
+
     # LLM相关
     'get_llm_client'
-] 
\ No newline at end of file
+]
+
+if os.getenv("CLOUDFUNCTION_EAGER_IMPORT") == "1":
+    for _name in _LAZY:
+        __getattr__(_name)
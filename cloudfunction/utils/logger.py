@@ -6,6 +6,8 @@ from pathlib import Path
 from typing import Any, Dict, Optional
 import copy
 import logging
+import logging.handlers
+import multiprocessing
 
 class JSONFormatter(logging.Formatter):
     """JSON 格式化器"""
@@ -214,6 +216,55 @@ def setup_default_logging(level: int = logging.INFO) -> None:
     ))
     root_logger.addHandler(console_handler)
 
+# 子进程日志队列及主进程中的监听线程，见 start_log_listener
+_log_queue = None
+_log_listener = None
+
+class _RecordDispatcher(logging.Handler):
+    """将子进程发来的日志记录交给主进程中同名 logger 的处理器"""
+    def handle(self, record):
+        logging.getLogger(record.name).handle(record)
+        return True
+
+def start_log_listener() -> None:
+    """在主进程中启动日志监听线程
+
+    之后 fork 出的子进程调用 redirect_to_log_queue() 后，日志记录经队列交回主进程，
+    由同名 logger 已配置的处理器统一写出，子进程不再自行格式化输出和写文件。
+    """
+    global _log_queue, _log_listener
+    if _log_listener is not None:
+        return
+    _log_queue = multiprocessing.Queue()
+    _log_listener = logging.handlers.QueueListener(_log_queue, _RecordDispatcher())
+    _log_listener.start()
+
+def stop_log_listener() -> None:
+    """停止日志监听线程，处理完队列中剩余的日志记录后返回"""
+    global _log_queue, _log_listener
+    if _log_listener is None:
+        return
+    _log_listener.stop()
+    _log_queue.close()
+    _log_listener = None
+    _log_queue = None
+
+def redirect_to_log_queue() -> None:
+    """在子进程中将已配置的日志处理器替换为写入日志队列的 QueueHandler
+
+    主进程未启动日志监听时不做任何修改。
+    """
+    if _log_queue is None:
+        return
+    handler = logging.handlers.QueueHandler(_log_queue)
+    loggers = [logging.getLogger()] + [
+        item for item in logging.Logger.manager.loggerDict.values()
+        if isinstance(item, logging.Logger)
+    ]
+    for item in loggers:
+        if item.handlers:
+            item.handlers = [handler]
+
 def get_logger(name: str) -> logging.Logger:
     """获取logger实例
     
@@ -0,0 +1,17 @@
+import asyncio
+
+def install_event_loop_policy() -> bool:
+    """安装更快的事件循环实现（uvloop），未安装时保留默认 asyncio 事件循环
+
+    需在 asyncio.run 之前调用。之后 fork 出的项目进程通过 asyncio.new_event_loop()
+    创建的事件循环同样使用该策略。
+
+    Returns:
+        bool: 是否已启用 uvloop
+    """
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
@@ -0,0 +1,47 @@
+"""
+cloudfunction.core 导出名称检查
+"""
+
+import importlib
+import unittest
+
+# 工厂函数 -> 对应的类名
+FACTORIES = {
+    'get_registry_class': 'FunctionRegistry',
+    'get_executor_class': 'FunctionExecutor',
+    'get_env_manager_class': 'EnvManager',
+    'get_state_class': 'ServerState',
+    'get_project_process_class': 'ProjectProcess',
+    'get_project_manager_class': 'ProjectManager',
+    'get_api_server_class': 'APIServer',
+    'get_master_class': 'Master',
+}
+
+# 重构为延迟导入前 cloudfunction.core 对外提供的名称
+BASELINE_NAMES = [*FACTORIES, *FACTORIES.values(), 'get_master']
+
+
+class CoreExportsTest(unittest.TestCase):
+    """cloudfunction.core 的导出名称与重构前保持一致"""
+
+    def setUp(self):
+        self.core = importlib.import_module('cloudfunction.core')
+
+    def test_baseline_names_importable(self):
+        for name in BASELINE_NAMES:
+            with self.subTest(name=name):
+                self.assertIsNotNone(getattr(self.core, name))
+
+    def test_factories_return_classes(self):
+        for factory, class_name in FACTORIES.items():
+            with self.subTest(factory=factory):
+                self.assertIs(getattr(self.core, factory)(), getattr(self.core, class_name))
+
+    def test_all_names_resolve(self):
+        for name in self.core.__all__:
+            with self.subTest(name=name):
+                self.assertIsNotNone(getattr(self.core, name))
+
+
+if __name__ == '__main__':
+    unittest.main()